@@ -2,27 +2,52 @@ import streamlit as st
 import subprocess
 import tempfile
 import os
+import re
+import string
 import duckdb
 import shutil
 import hashlib
+import hmac
+import secrets
+import copy
+import threading
+import time
+import queue
+from contextlib import contextmanager
 import pandas as pd
-import altair as alt
+import pyarrow as pa
+from concurrent.futures import ThreadPoolExecutor, wait
 from datetime import datetime
+from decimal import Decimal
 import json
-from PIL import Image
+import logging
+
+# Prefer orjson for the hot JSON paths, falling back to the stdlib
+try:
+    import orjson
+    _loads = orjson.loads
+    def _dumps(obj):
+        return orjson.dumps(obj).decode()
+except ImportError:
+    _loads = json.loads
+    _dumps = json.dumps
 
 # ====================================
 # APP CONFIGURATION
 # ====================================
-# Try to load custom page icon
-try:
-    page_icon = Image.open("assets/website_header_logo.png")
-except:
-    page_icon = "🦆"
+# altair and PIL are imported where they are used, keeping them off cold start
+@st.cache_resource(show_spinner=False)
+def _page_icon():
+    """Custom page icon, falling back to an emoji"""
+    try:
+        from PIL import Image
+        return Image.open("static/website_header_logo.png")
+    except Exception:
+        return "🦆"
 
 st.set_page_config(
     page_title="Decode data", 
-    page_icon=page_icon, 
+    page_icon=_page_icon(), 
     layout="wide",
     initial_sidebar_state="collapsed"
 )
@@ -47,217 +72,392 @@ MOTHERDUCK_SHARE = "decode_dbt"
 # ====================================
 # MOTHERDUCK STORAGE (Database-backed persistent storage)
 # ====================================
+# The storage layer logs failures instead of drawing st.error, so it is safe to
+# call from background threads; UserManager decides what the learner sees
+logger = logging.getLogger(__name__)
+
+def _isoformat(value):
+    """ISO string for a TIMESTAMP read back from storage (None stays None)"""
+    return value.isoformat() if value else None
+
 class MotherDuckStorage:
     """MotherDuck-backed storage for user data and progress"""
     
-    def __init__(self, motherduck_token, motherduck_share):
+    # Progress upsert, merged in SQL so writes from two sessions of a learner
+    # don't drop each other's updates: step and model lists are unioned (order
+    # kept, no repeats), lesson_progress only moves up, and queries_run is
+    # written as a delta that is added to the stored count
+    PROGRESS_ON_CONFLICT = """
+        ON CONFLICT (username, lesson_id) DO UPDATE SET
+            lesson_progress = least(100, greatest(coalesce(lp.lesson_progress, 0), EXCLUDED.lesson_progress)),
+            completed_steps = list_concat(
+                coalesce(lp.completed_steps, []),
+                list_filter(EXCLUDED.completed_steps, s -> NOT list_contains(coalesce(lp.completed_steps, []), s))
+            ),
+            models_executed = list_concat(
+                coalesce(lp.models_executed, []),
+                list_filter(EXCLUDED.models_executed, s -> NOT list_contains(coalesce(lp.models_executed, []), s))
+            ),
+            queries_run = coalesce(lp.queries_run, 0) + EXCLUDED.queries_run,
+            last_updated = EXCLUDED.last_updated
+    """
+    
+    # Shares whose tables were created/migrated in this process; the DDL only
+    # needs to run once, not for every storage instance
+    _initialized = set()
+    _initialized_lock = threading.Lock()
+    
+    # Share names are used as a SQL identifier, so only plain names are accepted
+    SHARE_NAME = re.compile(r"^[A-Za-z_][A-Za-z0-9_]*$")
+    
+    # Cursors are I/O-bound, so the pool is sized for concurrent sessions rather
+    # than CPU count; a checkout waits at most POOL_TIMEOUT seconds for a cursor
+    POOL_SIZE = 4
+    POOL_TIMEOUT = 10
+    
+    def __init__(self, motherduck_token, motherduck_share, pool_size=POOL_SIZE, pool_timeout=POOL_TIMEOUT):
+        if not self.SHARE_NAME.match(motherduck_share):
+            raise ValueError(f"Invalid MotherDuck share name: {motherduck_share!r}")
         self.motherduck_token = motherduck_token
         self.motherduck_share = motherduck_share
+        self.pool_size = pool_size
+        self.pool_timeout = pool_timeout
+        self._con = None
+        self._con_lock = threading.Lock()
+        self._pool = queue.Queue(maxsize=self.pool_size)
+        self._pool_created = 0
         self._init_tables()
     
     def _get_connection(self):
-        """Create a connection to MotherDuck"""
-        return duckdb.connect(f"md:{self.motherduck_share}?motherduck_token={self.motherduck_token}")
+        """Open a cursor on this storage's long-lived MotherDuck connection
+        
+        The connection is opened on first use and kept; reconnecting per call
+        cost a full handshake. Each cursor runs USE once, so queries name
+        tables without the share prefix and their text is the same everywhere.
+        """
+        with self._con_lock:
+            if self._con is None:
+                self._con = duckdb.connect(f"md:{self.motherduck_share}?motherduck_token={self.motherduck_token}")
+            cursor = self._con.cursor()
+        cursor.execute(f'USE "{self.motherduck_share}"')
+        return cursor
+    
+    def _discard(self, cursor):
+        """Drop a cursor that raised, reconnecting if the connection behind it is gone
+        
+        The cursor's pool slot is returned as None, so the next checkout of it
+        opens a fresh cursor.
+        """
+        try:
+            cursor.close()
+        except Exception:
+            pass
+        self._pool.put(None)
+        with self._con_lock:
+            if self._con is None:
+                return
+            try:
+                probe = self._con.cursor()
+                probe.execute("SELECT 1")
+                probe.close()
+            except Exception:
+                logger.warning("MotherDuck connection lost; reconnecting on next checkout")
+                try:
+                    self._con.close()
+                except Exception:
+                    pass
+                self._con = None
     
-    def _init_tables(self):
-        """Initialize storage tables if they don't exist"""
+    @contextmanager
+    def _checkout(self):
+        """Borrow a pooled cursor, so concurrent sessions don't queue on one handle
+        
+        Cursors are created lazily up to pool_size; past that, callers wait up
+        to pool_timeout for one to be returned. A cursor whose block raises is
+        discarded instead of going back to the pool.
+        """
         try:
-            con = self._get_connection()
-            
-            # Create users table
-            con.execute(f"""
-                CREATE TABLE IF NOT EXISTS {self.motherduck_share}.users (
-                    username VARCHAR PRIMARY KEY,
-                    password_hash VARCHAR NOT NULL,
-                    email VARCHAR NOT NULL,
-                    schema_name VARCHAR NOT NULL,
-                    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-                )
-            """)
-            
-            # Create progress table
-            con.execute(f"""
-                CREATE TABLE IF NOT EXISTS {self.motherduck_share}.learner_progress (
-                    username VARCHAR NOT NULL,
-                    lesson_id VARCHAR NOT NULL,
-                    lesson_progress INTEGER DEFAULT 0,
-                    completed_steps JSON,
-                    models_executed JSON,
-                    queries_run INTEGER DEFAULT 0,
-                    last_updated TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                    PRIMARY KEY (username, lesson_id)
-                )
-            """)
-            
-            # Create sessions table
-            con.execute(f"""
-                CREATE TABLE IF NOT EXISTS {self.motherduck_share}.user_sessions (
-                    session_token VARCHAR PRIMARY KEY,
-                    session_data JSON NOT NULL,
-                    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-                )
-            """)
-            
-            # Create model_edits table for persisting model changes
-            con.execute(f"""
-                CREATE TABLE IF NOT EXISTS {self.motherduck_share}.model_edits (
-                    username VARCHAR NOT NULL,
-                    lesson_id VARCHAR NOT NULL,
-                    model_name VARCHAR NOT NULL,
-                    model_sql TEXT NOT NULL,
-                    last_updated TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                    PRIMARY KEY (username, lesson_id, model_name)
-                )
-            """)
-            
-            con.close()
-        except Exception as e:
-            st.error(f"Error initializing storage tables: {e}")
+            con = self._pool.get_nowait()
+        except queue.Empty:
+            with self._con_lock:
+                can_create = self._pool_created < self.pool_size
+                if can_create:
+                    self._pool_created += 1
+            if can_create:
+                con = None
+            else:
+                try:
+                    con = self._pool.get(timeout=self.pool_timeout)
+                except queue.Empty:
+                    raise TimeoutError(f"No storage cursor free after {self.pool_timeout}s") from None
+        if con is None:
+            try:
+                con = self._get_connection()
+            except Exception:
+                self._pool.put(None)
+                raise
+        try:
+            yield con
+        except BaseException:
+            self._discard(con)
+            raise
+        self._pool.put(con)
+    
+    @contextmanager
+    def transaction(self):
+        """Run several statements on one pooled cursor as a single transaction
+        
+            with storage.transaction() as con:
+                con.execute(...)
+                con.execute(...)
+        
+        Commits when the block exits normally and rolls back if it raises.
+        """
+        with self._checkout() as con:
+            con.execute("BEGIN TRANSACTION")
+            try:
+                yield con
+            except BaseException:
+                con.execute("ROLLBACK")
+                raise
+            con.execute("COMMIT")
     
-    def get(self, key, shared=False):
-        """Retrieve a value"""
+    def _init_tables(self):
+        """Initialize storage tables if they don't exist
+        
+        Failures are raised out of __init__, so a storage instance is never
+        cached with missing tables and the next _get_storage() call retries.
+        """
+        with MotherDuckStorage._initialized_lock:
+            if self.motherduck_share in MotherDuckStorage._initialized:
+                return
         try:
-            con = self._get_connection()
-            
-            # Parse key to determine table and lookup
-            if key.startswith("user:"):
-                username = key.replace("user:", "")
-                result = con.execute(f"""
-                    SELECT username, password_hash, email, schema_name, created_at::VARCHAR as created_at
-                    FROM {self.motherduck_share}.users
-                    WHERE username = ?
-                """, [username]).fetchone()
+            # Creation and migrations apply together or not at all
+            with self.transaction() as con:
+                # Create users table
+                con.execute("""
+                    CREATE TABLE IF NOT EXISTS users (
+                        username VARCHAR PRIMARY KEY,
+                        password_hash VARCHAR NOT NULL,
+                        email VARCHAR NOT NULL,
+                        schema_name VARCHAR NOT NULL,
+                        created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                        password_salt VARCHAR
+                    )
+                """)
+                # Salted password hashes; NULL marks a legacy unsalted SHA-256 hash
+                con.execute("""
+                    ALTER TABLE users ADD COLUMN IF NOT EXISTS password_salt VARCHAR
+                """)
                 
-                if result:
-                    data = {
-                        "username": result[0],
-                        "password_hash": result[1],
-                        "email": result[2],
-                        "schema": result[3],
-                        "created_at": result[4]
-                    }
-                    con.close()
-                    return {'key': key, 'value': json.dumps(data), 'shared': shared}
+                # Create progress table
+                con.execute("""
+                    CREATE TABLE IF NOT EXISTS learner_progress (
+                        username VARCHAR NOT NULL,
+                        lesson_id VARCHAR NOT NULL,
+                        lesson_progress INTEGER DEFAULT 0,
+                        completed_steps VARCHAR[],
+                        models_executed VARCHAR[],
+                        queries_run INTEGER DEFAULT 0,
+                        last_updated TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                        PRIMARY KEY (username, lesson_id)
+                    )
+                """)
                 
-            elif key.startswith("progress:"):
-                parts = key.replace("progress:", "").split(":")
-                if len(parts) == 2:
-                    username, lesson_id = parts
-                    result = con.execute(f"""
-                        SELECT lesson_progress, completed_steps, models_executed, 
-                               queries_run, last_updated::VARCHAR as last_updated
-                        FROM {self.motherduck_share}.learner_progress
-                        WHERE username = ? AND lesson_id = ?
-                    """, [username, lesson_id]).fetchone()
-                    
-                    if result:
-                        data = {
-                            "lesson_progress": result[0],
-                            "completed_steps": json.loads(result[1]) if result[1] else [],
-                            "models_executed": json.loads(result[2]) if result[2] else [],
-                            "queries_run": result[3],
-                            "last_updated": result[4]
-                        }
-                        con.close()
-                        return {'key': key, 'value': json.dumps(data), 'shared': shared}
-            
-            elif key.startswith("session:"):
-                session_token = key.replace("session:", "")
-                result = con.execute(f"""
-                    SELECT session_data, created_at::VARCHAR as created_at
-                    FROM {self.motherduck_share}.user_sessions
-                    WHERE session_token = ?
-                """, [session_token]).fetchone()
+                # Migrate step/model lists stored as JSON by earlier versions to native lists
+                json_columns = con.execute("""
+                    SELECT column_name
+                    FROM information_schema.columns
+                    WHERE table_catalog = ? AND table_name = 'learner_progress'
+                      AND column_name IN ('completed_steps', 'models_executed') AND data_type = 'JSON'
+                """, [self.motherduck_share]).fetchall()
+                for (column,) in json_columns:
+                    con.execute(f"""
+                        ALTER TABLE learner_progress
+                        ALTER {column} TYPE VARCHAR[] USING from_json({column}, '["VARCHAR"]')
+                    """)
                 
-                if result:
-                    data = json.loads(result[0])
-                    data['created_at'] = result[1]
-                    con.close()
-                    return {'key': key, 'value': json.dumps(data), 'shared': shared}
-            
-            elif key.startswith("model:"):
-                # Format: model:username:lesson_id:model_name
-                parts = key.replace("model:", "").split(":")
-                if len(parts) == 3:
-                    username, lesson_id, model_name = parts
-                    result = con.execute(f"""
-                        SELECT model_sql, last_updated::VARCHAR as last_updated
-                        FROM {self.motherduck_share}.model_edits
-                        WHERE username = ? AND lesson_id = ? AND model_name = ?
-                    """, [username, lesson_id, model_name]).fetchone()
-                    
-                    if result:
-                        data = {
-                            "model_sql": result[0],
-                            "last_updated": result[1]
-                        }
-                        con.close()
-                        return {'key': key, 'value': json.dumps(data), 'shared': shared}
+                # Create sessions table
+                con.execute("""
+                    CREATE TABLE IF NOT EXISTS user_sessions (
+                        session_token VARCHAR PRIMARY KEY,
+                        session_data JSON NOT NULL,
+                        created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+                    )
+                """)
+                
+                # Create model_edits table for persisting model changes
+                con.execute("""
+                    CREATE TABLE IF NOT EXISTS model_edits (
+                        username VARCHAR NOT NULL,
+                        lesson_id VARCHAR NOT NULL,
+                        model_name VARCHAR NOT NULL,
+                        model_sql TEXT NOT NULL,
+                        last_updated TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                        PRIMARY KEY (username, lesson_id, model_name)
+                    )
+                """)
             
-            con.close()
+            with MotherDuckStorage._initialized_lock:
+                MotherDuckStorage._initialized.add(self.motherduck_share)
+        except Exception:
+            logger.exception("error initializing storage tables")
+            raise
+    
+    def _fetchone(self, sql, params):
+        """Run a single-row lookup on a pooled cursor"""
+        with self._checkout() as con:
+            return con.execute(sql, params).fetchone()
+    
+    def get_user(self, username):
+        """User record as a dict, or None if there is no such user
+        
+        Storage errors are raised rather than read as a missing user, so cached
+        callers don't keep a failed lookup.
+        """
+        try:
+            result = self._fetchone("""
+                SELECT username, password_hash, email, schema_name, created_at, password_salt
+                FROM users
+                WHERE username = ?
+            """, [username])
+        except Exception:
+            logger.exception("storage get error for user '%s'", username)
+            raise
+        if not result:
             return None
-        except Exception as e:
-            st.error(f"Storage get error for key '{key}': {e}")
+        return {
+            "username": result[0],
+            "password_hash": result[1],
+            "email": result[2],
+            "schema": result[3],
+            "created_at": _isoformat(result[4]),
+            "password_salt": result[5]
+        }
+    
+    def get_progress(self, username, lesson_id):
+        """One lesson's progress as a dict, or None if it hasn't been started
+        
+        Storage errors are raised, as in get_user.
+        """
+        try:
+            result = self._fetchone("""
+                SELECT lesson_progress, completed_steps, models_executed, queries_run, last_updated
+                FROM learner_progress
+                WHERE username = ? AND lesson_id = ?
+            """, [username, lesson_id])
+        except Exception:
+            logger.exception("storage get error for progress '%s:%s'", username, lesson_id)
+            raise
+        if not result:
             return None
+        return {
+            "lesson_progress": result[0],
+            "completed_steps": result[1] or [],
+            "models_executed": result[2] or [],
+            "queries_run": result[3],
+            "last_updated": _isoformat(result[4])
+        }
     
-    def set(self, key, value, shared=False):
-        """Store a value"""
+    def get_session(self, session_token):
+        """Login session data as a dict (with created_at), or None if the token is unknown
+        
+        Storage errors are raised, so a failed lookup isn't mistaken for a
+        missing session.
+        """
         try:
-            con = self._get_connection()
-            
-            # Parse key to determine table and operation
-            if key.startswith("user:"):
-                username = key.replace("user:", "")
-                user_data = json.loads(value)
-                
-                con.execute(f"""
-                    INSERT INTO {self.motherduck_share}.users 
-                        (username, password_hash, email, schema_name, created_at)
-                    VALUES (?, ?, ?, ?, ?)
+            result = self._fetchone("""
+                SELECT session_data, created_at
+                FROM user_sessions
+                WHERE session_token = ?
+            """, [session_token])
+        except Exception:
+            logger.exception("storage get error for session")
+            raise
+        if not result:
+            return None
+        data = _loads(result[0])
+        data['created_at'] = _isoformat(result[1])
+        return data
+    
+    def get_models(self, username, lesson_id):
+        """Every saved model of a learner's lesson in one query, keyed by model_name"""
+        try:
+            with self._checkout() as con:
+                rows = con.execute("""
+                    SELECT model_name, model_sql, last_updated
+                    FROM model_edits
+                    WHERE username = ? AND lesson_id = ?
+                """, [username, lesson_id]).fetchall()
+        except Exception:
+            logger.exception("storage get error for models of lesson '%s'", lesson_id)
+            return {}
+        return {
+            model_name: {
+                "model_sql": model_sql,
+                "last_updated": _isoformat(last_updated)
+            }
+            for model_name, model_sql, last_updated in rows
+        }
+    
+    def add_user(self, user_data):
+        """Insert a new user from a dict; False if the username is already taken
+        
+        Never updates an existing row, so a failed existence check can't lead to
+        an account being overwritten. Storage errors are raised.
+        """
+        try:
+            with self._checkout() as con:
+                inserted = con.execute("""
+                    INSERT INTO users 
+                        (username, password_hash, email, schema_name, created_at, password_salt)
+                    VALUES (?, ?, ?, ?, ?, ?)
+                    ON CONFLICT DO NOTHING
+                    RETURNING username
+                """, [
+                    user_data['username'],
+                    user_data['password_hash'],
+                    user_data['email'],
+                    user_data['schema'],
+                    user_data['created_at'],
+                    user_data.get('password_salt')
+                ]).fetchall()
+        except Exception:
+            logger.exception("storage insert error for user '%s'", user_data.get('username'))
+            raise
+        return bool(inserted)
+    
+    def set_user(self, user_data):
+        """Create or update a user from a dict"""
+        try:
+            with self._checkout() as con:
+                con.execute("""
+                    INSERT INTO users 
+                        (username, password_hash, email, schema_name, created_at, password_salt)
+                    VALUES (?, ?, ?, ?, ?, ?)
                     ON CONFLICT (username) DO UPDATE SET
                         password_hash = EXCLUDED.password_hash,
+                        password_salt = EXCLUDED.password_salt,
                         email = EXCLUDED.email
                 """, [
                     user_data['username'],
                     user_data['password_hash'],
                     user_data['email'],
                     user_data['schema'],
-                    user_data['created_at']
+                    user_data['created_at'],
+                    user_data.get('password_salt')
                 ])
-                
-            elif key.startswith("progress:"):
-                parts = key.replace("progress:", "").split(":")
-                if len(parts) == 2:
-                    username, lesson_id = parts
-                    progress_data = json.loads(value)
-                    
-                    con.execute(f"""
-                        INSERT INTO {self.motherduck_share}.learner_progress 
-                            (username, lesson_id, lesson_progress, completed_steps, 
-                             models_executed, queries_run, last_updated)
-                        VALUES (?, ?, ?, ?, ?, ?, ?)
-                        ON CONFLICT (username, lesson_id) DO UPDATE SET
-                            lesson_progress = EXCLUDED.lesson_progress,
-                            completed_steps = EXCLUDED.completed_steps,
-                            models_executed = EXCLUDED.models_executed,
-                            queries_run = EXCLUDED.queries_run,
-                            last_updated = EXCLUDED.last_updated
-                    """, [
-                        username,
-                        lesson_id,
-                        progress_data.get('lesson_progress', 0),
-                        json.dumps(progress_data.get('completed_steps', [])),
-                        json.dumps(progress_data.get('models_executed', [])),
-                        progress_data.get('queries_run', 0),
-                        progress_data.get('last_updated', datetime.now().isoformat())
-                    ])
-            
-            elif key.startswith("session:"):
-                session_token = key.replace("session:", "")
-                session_data = json.loads(value)
-                
-                con.execute(f"""
-                    INSERT INTO {self.motherduck_share}.user_sessions 
+            return True
+        except Exception:
+            logger.exception("storage set error for user '%s'", user_data.get('username'))
+            return False
+    
+    def set_session(self, session_token, session_data):
+        """Create or update a login session from a dict"""
+        try:
+            with self._checkout() as con:
+                con.execute("""
+                    INSERT INTO user_sessions 
                         (session_token, session_data, created_at)
                     VALUES (?, ?, ?)
                     ON CONFLICT (session_token) DO UPDATE SET
@@ -265,218 +465,289 @@ class MotherDuckStorage:
                         created_at = EXCLUDED.created_at
                 """, [
                     session_token,
-                    json.dumps(session_data),
+                    _dumps(session_data),
                     session_data.get('created_at', datetime.now().isoformat())
                 ])
-            
-            elif key.startswith("model:"):
-                # Format: model:username:lesson_id:model_name
-                parts = key.replace("model:", "").split(":")
-                if len(parts) == 3:
-                    username, lesson_id, model_name = parts
-                    model_data = json.loads(value)
-                    
-                    con.execute(f"""
-                        INSERT INTO {self.motherduck_share}.model_edits 
-                            (username, lesson_id, model_name, model_sql, last_updated)
-                        VALUES (?, ?, ?, ?, ?)
-                        ON CONFLICT (username, lesson_id, model_name) DO UPDATE SET
-                            model_sql = EXCLUDED.model_sql,
-                            last_updated = EXCLUDED.last_updated
-                    """, [
-                        username,
-                        lesson_id,
-                        model_name,
-                        model_data['model_sql'],
-                        model_data.get('last_updated', datetime.now().isoformat())
-                    ])
-            
-            con.close()
-            return {'key': key, 'value': value, 'shared': shared}
-        except Exception as e:
-            st.error(f"Storage set error for key '{key}': {e}")
-            return None
+            return True
+        except Exception:
+            logger.exception("storage set error for session")
+            return False
     
-    def delete(self, key, shared=False):
-        """Delete a value"""
+    def set_model(self, username, lesson_id, model_name, model_data):
+        """Create or update a learner's edited model SQL from a dict"""
         try:
-            con = self._get_connection()
-            
-            if key.startswith("user:"):
-                username = key.replace("user:", "")
-                con.execute(f"""
-                    DELETE FROM {self.motherduck_share}.users WHERE username = ?
-                """, [username])
-                
-            elif key.startswith("progress:"):
-                parts = key.replace("progress:", "").split(":")
-                if len(parts) == 2:
-                    username, lesson_id = parts
-                    con.execute(f"""
-                        DELETE FROM {self.motherduck_share}.learner_progress 
-                        WHERE username = ? AND lesson_id = ?
-                    """, [username, lesson_id])
-            
-            elif key.startswith("session:"):
-                session_token = key.replace("session:", "")
-                con.execute(f"""
-                    DELETE FROM {self.motherduck_share}.user_sessions 
+            with self._checkout() as con:
+                con.execute("""
+                    INSERT INTO model_edits 
+                        (username, lesson_id, model_name, model_sql, last_updated)
+                    VALUES (?, ?, ?, ?, ?)
+                    ON CONFLICT (username, lesson_id, model_name) DO UPDATE SET
+                        model_sql = EXCLUDED.model_sql,
+                        last_updated = EXCLUDED.last_updated
+                """, [
+                    username,
+                    lesson_id,
+                    model_name,
+                    model_data['model_sql'],
+                    model_data.get('last_updated', datetime.now().isoformat())
+                ])
+            return True
+        except Exception:
+            logger.exception("storage set error for model '%s'", model_name)
+            return False
+    
+    def delete_session(self, session_token):
+        """Delete a login session"""
+        try:
+            with self._checkout() as con:
+                con.execute("""
+                    DELETE FROM user_sessions 
                     WHERE session_token = ?
                 """, [session_token])
-            
-            con.close()
-            return {'key': key, 'deleted': True, 'shared': shared}
-        except Exception as e:
-            st.error(f"Storage delete error: {e}")
-            return None
+            return True
+        except Exception:
+            logger.exception("storage delete error for session")
+            return False
+    
+    def set_progress_many(self, rows):
+        """Upsert many progress rows in one statement
+        
+        rows: iterable of (username, lesson_id, progress_data) tuples, where
+        progress_data['queries_run'] is the number of queries since the last
+        write. The rows are staged as a DataFrame and inserted with a single
+        INSERT ... SELECT.
+        """
+        staging = pd.DataFrame(
+            [
+                (
+                    username,
+                    lesson_id,
+                    progress_data.get('lesson_progress', 0),
+                    list(progress_data.get('completed_steps', [])),
+                    list(progress_data.get('models_executed', [])),
+                    progress_data.get('queries_run', 0),
+                    progress_data.get('last_updated', datetime.now().isoformat())
+                )
+                for username, lesson_id, progress_data in rows
+            ],
+            columns=["username", "lesson_id", "lesson_progress", "completed_steps",
+                     "models_executed", "queries_run", "last_updated"]
+        )
+        if staging.empty:
+            return True
+        
+        try:
+            with self._checkout() as con:
+                con.register("staging_progress", staging)
+                try:
+                    con.execute(f"""
+                        INSERT INTO learner_progress AS lp
+                            (username, lesson_id, lesson_progress, completed_steps,
+                             models_executed, queries_run, last_updated)
+                        SELECT username, lesson_id, lesson_progress, completed_steps::VARCHAR[],
+                               models_executed::VARCHAR[], queries_run, last_updated::TIMESTAMP
+                        FROM staging_progress
+                        {self.PROGRESS_ON_CONFLICT}
+                    """)
+                finally:
+                    con.unregister("staging_progress")
+            return True
+        except Exception:
+            logger.exception("storage batch progress error")
+            return False
     
-    def list(self, prefix=None, shared=False):
-        """List keys with optional prefix"""
+    def get_progress_many(self, username, lesson_ids):
+        """Progress for the given lessons of a learner in one query, keyed by lesson_id"""
         try:
-            con = self._get_connection()
-            keys = []
-            
-            if prefix and prefix.startswith("progress:"):
-                username = prefix.replace("progress:", "").rstrip(":")
-                result = con.execute(f"""
-                    SELECT username, lesson_id
-                    FROM {self.motherduck_share}.learner_progress
-                    WHERE username = ?
-                """, [username]).fetchall()
-                
-                keys = [f"progress:{row[0]}:{row[1]}" for row in result]
-            
-            con.close()
-            return {'keys': keys, 'prefix': prefix, 'shared': shared}
-        except Exception as e:
-            st.error(f"Storage list error: {e}")
-            return {'keys': [], 'prefix': prefix, 'shared': shared}
+            with self._checkout() as con:
+                rows = con.execute("""
+                    SELECT lesson_id, lesson_progress, completed_steps, models_executed,
+                           queries_run, last_updated
+                    FROM learner_progress
+                    WHERE username = ? AND lesson_id IN (SELECT UNNEST(?))
+                """, [username, list(lesson_ids)]).fetchall()
+        except Exception:
+            logger.exception("storage progress error")
+            return {}
+        return {
+            lesson_id: {
+                "lesson_progress": lesson_progress,
+                "completed_steps": completed_steps or [],
+                "models_executed": models_executed or [],
+                "queries_run": queries_run,
+                "last_updated": _isoformat(last_updated)
+            }
+            for lesson_id, lesson_progress, completed_steps, models_executed, queries_run, last_updated in rows
+        }
 
-# Initialize MotherDuck storage in session state
-if 'storage_api' not in st.session_state:
-    st.session_state.storage_api = MotherDuckStorage(MOTHERDUCK_TOKEN, MOTHERDUCK_SHARE)
+@st.cache_resource(show_spinner=False)
+def _get_storage():
+    """Process-wide MotherDuck storage shared by every session (and its cursor pool)"""
+    return MotherDuckStorage(MOTHERDUCK_TOKEN, MOTHERDUCK_SHARE)
 
 # ====================================
 # HELPER FUNCTIONS FOR UI
 # ====================================
+@st.cache_resource(show_spinner=False)
+def _encode_image_base64(image_path, mtime):
+    """Base64 of an image file, encoded once per (path, mtime)"""
+    import base64
+    with open(image_path, "rb") as img_file:
+        return base64.b64encode(img_file.read()).decode()
+
 def get_base64_image(image_path):
     """Convert local image to base64 for embedding in HTML"""
-    import base64
     try:
-        with open(image_path, "rb") as img_file:
-            return base64.b64encode(img_file.read()).decode()
+        return _encode_image_base64(image_path, os.path.getmtime(image_path))
     except Exception as e:
         st.warning(f"Could not load logo image: {e}")
         return None
 
+def get_image_src(filename):
+    """Get an <img> src for a file in static/, served by Streamlit when static serving is enabled"""
+    if not os.path.exists(os.path.join("static", filename)):
+        return None
+    if st.get_option("server.enableStaticServing"):
+        # Browser fetches and caches the file instead of receiving it inline on every rerun
+        return f"app/static/{filename}"
+    image_base64 = get_base64_image(os.path.join("static", filename))
+    return f"data:image/png;base64,{image_base64}" if image_base64 else None
+
 # ====================================
 # AUTHENTICATION & USER MANAGEMENT
 # ====================================
+# The login session token lives in the URL. st.query_params (Streamlit 1.30+) is a
+# live mapping; older releases only have the experimental get/set functions.
+_st_query_params = getattr(st, "query_params", None)
+
+def get_session_param():
+    """Session token from the URL query string, or None"""
+    if _st_query_params is not None:
+        return _st_query_params.get("session")
+    return (st.experimental_get_query_params().get("session") or [None])[0]
+
+def set_session_param(session_token=None):
+    """Put the session token in the URL, or remove it when None"""
+    if _st_query_params is not None:
+        if session_token:
+            _st_query_params["session"] = session_token
+        else:
+            _st_query_params.clear()
+    elif session_token:
+        st.experimental_set_query_params(session=session_token)
+    else:
+        st.experimental_set_query_params()
+
+# User and progress reads repeat across reruns, so they are cached briefly;
+# UserManager clears the cache whenever it writes the same data. Storage errors
+# are raised through them, since st.cache_data doesn't keep a call that raised
+@st.cache_data(ttl=60, show_spinner=False)
+def _get_user_cached(username):
+    return _get_storage().get_user(username)
+
+@st.cache_data(ttl=10, show_spinner=False)
+def _get_progress_cached(username, lesson_id):
+    return _get_storage().get_progress(username, lesson_id)
+
 class UserManager:
     @staticmethod
-    def hash_password(password):
-        """Hash password using SHA-256"""
-        return hashlib.sha256(password.encode()).hexdigest()
+    def hash_password(password, salt):
+        """Hash password with scrypt using a hex-encoded salt"""
+        return hashlib.scrypt(password.encode(), salt=bytes.fromhex(salt), n=2**14, r=8, p=1).hex()
+    
+    @staticmethod
+    def verify_password(user, password):
+        """Check a password against a stored user, including legacy SHA-256 hashes"""
+        if user.get('password_salt'):
+            expected = UserManager.hash_password(password, user['password_salt'])
+        else:
+            expected = hashlib.sha256(password.encode()).hexdigest()
+        return hmac.compare_digest(user['password_hash'], expected)
     
     @staticmethod
     def create_user(username, password, email):
         """Create a new user account"""
         try:
-            # Check if user exists
-            existing = UserManager.get_user(username)
-            if existing:
-                return False, "Username already exists"
-            
+            salt = secrets.token_hex(16)
             user_data = {
                 "username": username,
-                "password_hash": UserManager.hash_password(password),
+                "password_hash": UserManager.hash_password(password, salt),
+                "password_salt": salt,
                 "email": email,
                 "created_at": datetime.now().isoformat(),
                 "schema": f"learner_{hashlib.sha256(username.encode()).hexdigest()[:8]}"
             }
             
-            # Store user credentials (shared=False for privacy)
-            result = st.session_state.storage_api.set(
-                f"user:{username}", 
-                json.dumps(user_data),
-                shared=False
-            )
-            
-            if result:
-                return True, "Account created successfully"
-            return False, "Failed to create account"
+            # Store user credentials (shared=False for privacy); the insert
+            # fails instead of overwriting when the username is taken
+            if not _get_storage().add_user(user_data):
+                return False, "Username already exists"
+            _get_user_cached.clear()
+            return True, "Account created successfully"
         except Exception as e:
             return False, f"Error: {str(e)}"
     
     @staticmethod
     def get_user(username):
-        """Retrieve user data"""
-        try:
-            result = st.session_state.storage_api.get(f"user:{username}", shared=False)
-            if result and result.get('value'):
-                return json.loads(result['value'])
-            return None
-        except Exception as e:
-            st.error(f"Error retrieving user: {e}")
-            return None
+        """Retrieve user data (None for an unknown user; storage errors are raised)"""
+        return _get_user_cached(username)
     
     @staticmethod
     def authenticate(username, password):
         """Authenticate user credentials and create session"""
-        user = UserManager.get_user(username)
+        try:
+            user = UserManager.get_user(username)
+        except Exception:
+            return False, "Could not reach account storage - please try again"
         if not user:
             return False, "User not found"
         
-        if user['password_hash'] == UserManager.hash_password(password):
+        if UserManager.verify_password(user, password):
+            # Upgrade a legacy unsalted hash now that the plain password is known
+            if not user.get('password_salt'):
+                salt = secrets.token_hex(16)
+                user = {**user, 'password_salt': salt, 'password_hash': UserManager.hash_password(password, salt)}
+                if _get_storage().set_user(user):
+                    _get_user_cached.clear()
+            
             # Create session token
-            session_token = hashlib.sha256(f"{username}{datetime.now().isoformat()}".encode()).hexdigest()
+            session_token = secrets.token_urlsafe(32)
             
-            # Store session in MotherDuck
+            # Store session in MotherDuck; the created_at column gets the current
+            # time, and the payload keeps epoch seconds for the expiry check
             session_data = {
                 'username': username,
-                'created_at': datetime.now().isoformat()
+                'created_epoch': int(time.time())
             }
-            st.session_state.storage_api.set(
-                f"session:{session_token}",
-                json.dumps(session_data),
-                shared=False
-            )
-            
-            # Set query param for session persistence (compatible with older Streamlit)
-            try:
-                st.experimental_set_query_params(session=session_token)
-            except:
-                pass  # Fallback if query params not supported
+            if _get_storage().set_session(session_token, session_data):
+                # Set query param for session persistence
+                set_session_param(session_token)
+            else:
+                st.warning("Signed in, but the session could not be saved - refreshing the page will sign you out.")
             
             return True, user
         return False, "Invalid password"
     
     @staticmethod
-    def save_progress(username, lesson_id, progress_data):
-        """Save learner progress"""
-        try:
-            key = f"progress:{username}:{lesson_id}"
-            progress_data['last_updated'] = datetime.now().isoformat()
-            result = st.session_state.storage_api.set(
-                key,
-                json.dumps(progress_data),
-                shared=False
-            )
-            return result is not None
-        except Exception as e:
-            st.error(f"Error saving progress: {e}")
-            return False
+    def save_progress_many(username, progress_by_lesson, storage_api=None):
+        """Save progress for several lessons in one write (pass storage_api off the script thread)"""
+        storage_api = storage_api or _get_storage()
+        now = datetime.now().isoformat()
+        for progress_data in progress_by_lesson.values():
+            progress_data['last_updated'] = now
+        saved = storage_api.set_progress_many(
+            (username, lesson_id, progress_data) for lesson_id, progress_data in progress_by_lesson.items()
+        )
+        _get_progress_cached.clear()
+        return saved
     
     @staticmethod
     def get_progress(username, lesson_id):
         """Retrieve learner progress"""
         try:
-            result = st.session_state.storage_api.get(
-                f"progress:{username}:{lesson_id}",
-                shared=False
-            )
-            if result and result.get('value'):
-                return json.loads(result['value'])
+            progress = _get_progress_cached(username, lesson_id)
+            if progress:
+                return progress
             return {
                 'lesson_progress': 0,
                 'completed_steps': [],
@@ -489,388 +760,29 @@ class UserManager:
             return None
     
     @staticmethod
-    def get_all_progress(username):
-        """Get progress for all lessons"""
+    def get_progress_many(username, lesson_ids):
+        """Get progress for a set of lessons in one round-trip"""
         try:
-            result = st.session_state.storage_api.list(f"progress:{username}:", shared=False)
-            if result and result.get('keys'):
-                all_progress = {}
-                for key in result['keys']:
-                    lesson_id = key.split(':')[-1]
-                    progress = UserManager.get_progress(username, lesson_id)
-                    if progress:
-                        all_progress[lesson_id] = progress
-                return all_progress
-            return {}
+            return _get_storage().get_progress_many(username, lesson_ids)
         except Exception as e:
-            st.error(f"Error retrieving all progress: {e}")
+            st.error(f"Error retrieving progress: {e}")
             return {}
 
 # ====================================
 # CUSTOM THEME & STYLING
 # ====================================
+THEME_CSS_PATH = "static/theme.css"
+
+@st.cache_resource(show_spinner=False)
+def _theme_css(mtime):
+    """App stylesheet as a <style> block, read once per (file, mtime)"""
+    with open(THEME_CSS_PATH, encoding="utf-8") as f:
+        return f"<style>\n{f.read()}</style>"
+
 def apply_custom_theme():
-    st.markdown("""
-    <style>
-    @import url('https://fonts.googleapis.com/css2?family=Inter:wght@300;400;500;600;700&display=swap');
-    
-    /* Base styling */
-    * {
-        font-family: 'Inter', -apple-system, BlinkMacSystemFont, sans-serif;
-    }
-    
-    .stApp {
-        background: linear-gradient(135deg, #f8fafc 0%, #f1f5f9 100%);
-    }
-    
-    /* Main content area */
-    .main .block-container {
-        padding-top: 2rem;
-        padding-bottom: 2rem;
-        max-width: 1400px;
-    }
-    
-    /* Headers */
-    h1 {
-        color: #1e40af !important;
-        font-weight: 700 !important;
-        font-size: 2.5rem !important;
-        margin-bottom: 0.5rem !important;
-    }
-    
-    h2 {
-        color: #2563eb !important;
-        font-weight: 600 !important;
-        font-size: 1.8rem !important;
-        margin-top: 2rem !important;
-        margin-bottom: 1rem !important;
-    }
-    
-    h3 {
-        color: #3b82f6 !important;
-        font-weight: 600 !important;
-        font-size: 1.4rem !important;
-        margin-top: 1.5rem !important;
-        margin-bottom: 0.75rem !important;
-    }
-    
-    /* Regular text */
-    p, .stMarkdown {
-        color: #475569 !important;
-    }
-    
-    /* Tabs styling */
-    .stTabs [data-baseweb="tab-list"] {
-        gap: 8px;
-        background-color: #ffffff;
-        border-radius: 12px;
-        padding: 6px;
-        box-shadow: 0 1px 3px rgba(0, 0, 0, 0.08);
-    }
-    
-    .stTabs [data-baseweb="tab"] {
-        background-color: transparent;
-        border-radius: 8px;
-        color: #64748b;
-        font-weight: 500;
-        padding: 10px 20px;
-        transition: all 0.2s ease;
-    }
-    
-    .stTabs [data-baseweb="tab"]:hover {
-        background-color: #f1f5f9;
-        color: #3b82f6;
-    }
-    
-    .stTabs [aria-selected="true"] {
-        background: linear-gradient(135deg, #3b82f6 0%, #2563eb 100%) !important;
-        color: white !important;
-        box-shadow: 0 2px 8px rgba(59, 130, 246, 0.25);
-    }
-    
-    .stTabs [aria-selected="true"] p {
-        color: white !important;
-    }
-    
-    /* Buttons */
-    .stButton > button {
-        background: linear-gradient(135deg, #93c5fd 0%, #60a5fa 100%) !important;
-        color: white !important;
-        border: none;
-        border-radius: 10px;
-        padding: 0.6rem 1.75rem;
-        font-weight: 600;
-        transition: all 0.3s ease;
-        width: 100%;
-        box-shadow: 0 2px 8px rgba(147, 197, 253, 0.3);
-    }
-    
-    .stButton > button:hover {
-        background: linear-gradient(135deg, #60a5fa 0%, #3b82f6 100%) !important;
-        color: white !important;
-        box-shadow: 0 4px 12px rgba(96, 165, 250, 0.4);
-        transform: translateY(-2px);
-    }
-    
-    .stButton > button p {
-        color: white !important;
-    }
-    
-    .stButton > button:active {
-        transform: translateY(0);
-    }
-    
-    /* Primary button */
-    .stButton > button[kind="primary"] {
-        background: linear-gradient(135deg, #10b981 0%, #059669 100%);
-        box-shadow: 0 2px 8px rgba(16, 185, 129, 0.2);
-    }
-    
-    .stButton > button[kind="primary"]:hover {
-        background: linear-gradient(135deg, #059669 0%, #047857 100%);
-        box-shadow: 0 4px 12px rgba(16, 185, 129, 0.35);
-    }
-    
-    /* Secondary button */
-    .stButton > button[kind="secondary"] {
-        background: linear-gradient(135deg, #8b5cf6 0%, #7c3aed 100%);
-        box-shadow: 0 2px 8px rgba(139, 92, 246, 0.2);
-    }
-    
-    .stButton > button[kind="secondary"]:hover {
-        background: linear-gradient(135deg, #7c3aed 0%, #6d28d9 100%);
-        box-shadow: 0 4px 12px rgba(139, 92, 246, 0.35);
-    }
-    
-    /* Input fields */
-    .stTextInput > div > div > input,
-    .stTextArea > div > div > textarea {
-        background-color: #ffffff;
-        border: 2px solid #e2e8f0;
-        border-radius: 10px;
-        color: #1e293b;
-        padding: 0.75rem;
-        transition: all 0.2s ease;
-    }
-    
-    .stTextInput > div > div > input:focus,
-    .stTextArea > div > div > textarea:focus {
-        border-color: #3b82f6;
-        box-shadow: 0 0 0 3px rgba(59, 130, 246, 0.1);
-        outline: none;
-    }
-    
-    /* Select boxes */
-    .stSelectbox > div > div {
-        background-color: #ffffff;
-        border: 2px solid #e2e8f0;
-        border-radius: 10px;
-        color: #1e293b;
-    }
-    
-    /* Checkboxes */
-    .stCheckbox > label {
-        color: #475569 !important;
-        font-weight: 500;
-    }
-    
-    /* Dataframes */
-    .stDataFrame {
-        border: 2px solid #e2e8f0;
-        border-radius: 12px;
-        background-color: #ffffff;
-        box-shadow: 0 1px 3px rgba(0, 0, 0, 0.05);
-    }
-    
-    /* Code blocks */
-    .stCodeBlock {
-        border-radius: 12px;
-        border: 2px solid #e2e8f0;
-        background-color: #f8fafc;
-        box-shadow: 0 1px 3px rgba(0, 0, 0, 0.05);
-    }
-    
-    /* Expander */
-    .streamlit-expanderHeader {
-        background-color: #ffffff;
-        border-radius: 10px;
-        color: #1e293b !important;
-        font-weight: 600;
-        border: 2px solid #e2e8f0;
-        transition: all 0.2s ease;
-    }
-    
-    .streamlit-expanderHeader:hover {
-        border-color: #3b82f6;
-        background-color: #f8fafc;
-    }
-    
-    .streamlit-expanderContent {
-        background-color: #ffffff;
-        border: 2px solid #e2e8f0;
-        border-top: none;
-        border-bottom-left-radius: 10px;
-        border-bottom-right-radius: 10px;
-    }
-    
-    /* Metrics */
-    [data-testid="stMetricValue"] {
-        color: #1e40af !important;
-        font-size: 1.8rem !important;
-        font-weight: 700 !important;
-    }
-    
-    [data-testid="stMetricLabel"] {
-        color: #64748b !important;
-        font-weight: 600 !important;
-        font-size: 0.9rem !important;
-    }
-    
-    [data-testid="stMetric"] {
-        background-color: #ffffff;
-        padding: 1rem;
-        border-radius: 12px;
-        border: 2px solid #e2e8f0;
-        box-shadow: 0 1px 3px rgba(0, 0, 0, 0.05);
-    }
-    
-    /* Alert boxes */
-    .stAlert {
-        border-radius: 12px;
-        border-left: 4px solid;
-        box-shadow: 0 1px 3px rgba(0, 0, 0, 0.08);
-    }
-    
-    /* Success */
-    .stSuccess {
-        background-color: #f0fdf4;
-        border-left-color: #10b981;
-        color: #065f46 !important;
-    }
-    
-    /* Info */
-    .stInfo {
-        background-color: #eff6ff;
-        border-left-color: #3b82f6;
-        color: #1e40af !important;
-    }
-    
-    /* Warning */
-    .stWarning {
-        background-color: #fffbeb;
-        border-left-color: #f59e0b;
-        color: #92400e !important;
-    }
-    
-    /* Error */
-    .stException {
-        background-color: #fef2f2;
-        border-left-color: #ef4444;
-        color: #991b1b !important;
-    }
-    
-    /* Progress bar */
-    .stProgress > div > div > div {
-        background: linear-gradient(90deg, #3b82f6, #8b5cf6);
-        border-radius: 10px;
-    }
-    
-    .stProgress > div > div {
-        background-color: #e2e8f0;
-        border-radius: 10px;
-    }
-    
-    /* Hide Streamlit branding */
-    #MainMenu {visibility: hidden;}
-    footer {visibility: hidden;}
-    .stDeployButton {display: none;}
-    
-    /* Scrollbar */
-    ::-webkit-scrollbar {
-        width: 12px;
-        height: 12px;
-    }
-    
-    ::-webkit-scrollbar-track {
-        background: #f1f5f9;
-        border-radius: 10px;
-    }
-    
-    ::-webkit-scrollbar-thumb {
-        background: #cbd5e1;
-        border-radius: 10px;
-        border: 3px solid #f1f5f9;
-    }
-    
-    ::-webkit-scrollbar-thumb:hover {
-        background: #94a3b8;
-    }
-    
-    /* Login/Register Card */
-    .auth-card {
-        background: #ffffff;
-        border: 2px solid #e2e8f0;
-        border-radius: 16px;
-        padding: 2.5rem;
-        margin: 2rem 0;
-        box-shadow: 0 4px 12px rgba(0, 0, 0, 0.08);
-    }
-    
-    /* Lesson Cards */
-    div[style*="background: linear-gradient(135deg, rgba(59, 130, 246, 0.1)"] {
-        background: #ffffff !important;
-        border: 2px solid #e2e8f0 !important;
-        box-shadow: 0 2px 8px rgba(0, 0, 0, 0.06) !important;
-        transition: all 0.3s ease !important;
-    }
-    
-    div[style*="background: linear-gradient(135deg, rgba(59, 130, 246, 0.1)"]:hover {
-        border-color: #3b82f6 !important;
-        box-shadow: 0 4px 16px rgba(59, 130, 246, 0.15) !important;
-        transform: translateY(-2px);
-    }
-    
-    /* Quiz question cards */
-    div[style*="background: rgba(59, 130, 246, 0.05)"] {
-        background: #f8fafc !important;
-        border: 2px solid #e2e8f0 !important;
-        box-shadow: 0 1px 3px rgba(0, 0, 0, 0.05) !important;
-    }
-    
-    /* Sidebar (if needed) */
-    [data-testid="stSidebar"] {
-        background: linear-gradient(180deg, #ffffff 0%, #f8fafc 100%);
-        border-right: 2px solid #e2e8f0;
-    }
-    
-    /* Form containers */
-    [data-testid="stForm"] {
-        background: #ffffff;
-        border: 2px solid #e2e8f0;
-        border-radius: 12px;
-        padding: 1.5rem;
-        box-shadow: 0 2px 8px rgba(0, 0, 0, 0.06);
-    }
-    
-    /* Improve overall card aesthetics */
-    .element-container {
-        transition: all 0.2s ease;
-    }
-    
-    /* Better spacing */
-    .row-widget.stButton {
-        padding: 0.25rem 0;
-    }
-    
-    /* Enhanced header section */
-    div[data-testid="column"] > div[style*="text-align: left"] h1 {
-        background: linear-gradient(135deg, #1e40af 0%, #3b82f6 100%);
-        -webkit-background-clip: text;
-        -webkit-text-fill-color: transparent;
-        background-clip: text;
-    }
-    </style>
-    """, unsafe_allow_html=True)
+    # Streamlit drops elements that a rerun doesn't emit, so the cached
+    # stylesheet is still written on every run
+    st.markdown(_theme_css(os.path.getmtime(THEME_CSS_PATH)), unsafe_allow_html=True)
 
 # Apply custom theme
 apply_custom_theme()
@@ -878,81 +790,55 @@ apply_custom_theme()
 # ====================================
 # UI COMPONENTS
 # ====================================
-def create_lesson_card(title, description, icon="📘", progress=0):
-    # Build the complete HTML in one go to avoid escaping issues
-    if progress > 0:
-        card_html = f"""
-        <div style="
-            background: linear-gradient(135deg, rgba(59, 130, 246, 0.1) 0%, rgba(139, 92, 246, 0.1) 100%);
-            border: 1px solid rgba(59, 130, 246, 0.3);
-            border-radius: 12px;
-            padding: 1.5rem;
-            margin: 1rem 0;
-        ">
-            <div style="display: flex; align-items: start; gap: 1rem;">
-                <div style="font-size: 2rem;">{icon}</div>
-                <div style="flex: 1;">
-                    <h4 style="color: #93c5fd; margin: 0 0 0.5rem 0; font-size: 1.2rem;">{title}</h4>
-                    <p style="color: #94a3b8; margin: 0 0 0.75rem 0; font-size: 0.95rem;">{description}</p>
-                    <div style="
-                        width: 100%;
-                        height: 6px;
-                        background-color: rgba(59, 130, 246, 0.2);
-                        border-radius: 3px;
-                        overflow: hidden;
-                    ">
-                        <div style="
-                            width: {progress}%;
-                            height: 100%;
-                            background: linear-gradient(90deg, #3b82f6, #8b5cf6);
-                            transition: width 0.3s ease;
-                        "></div>
+# Lesson card markup; the static HTML is built once and only the fields are
+# filled in per card. Styling lives in the .lesson-card rules of the theme CSS.
+_CARD_WITH_PROGRESS = """
+        <div class="lesson-card">
+            <div class="lesson-card-body">
+                <div class="lesson-card-icon">{icon}</div>
+                <div class="lesson-card-text">
+                    <h4 class="lesson-card-title">{title}</h4>
+                    <p class="lesson-card-desc">{description}</p>
+                    <div class="lesson-card-track">
+                        <div class="lesson-card-fill" style="width: {progress}%;"></div>
                     </div>
-                    <p style="color: #60a5fa; margin: 0.5rem 0 0 0; font-size: 0.85rem; font-weight: 600;">Progress: {progress}%</p>
+                    <p class="lesson-card-pct">Progress: {progress}%</p>
                 </div>
             </div>
         </div>
         """
-    else:
-        card_html = f"""
-        <div style="
-            background: linear-gradient(135deg, rgba(59, 130, 246, 0.1) 0%, rgba(139, 92, 246, 0.1) 100%);
-            border: 1px solid rgba(59, 130, 246, 0.3);
-            border-radius: 12px;
-            padding: 1.5rem;
-            margin: 1rem 0;
-        ">
-            <div style="display: flex; align-items: start; gap: 1rem;">
-                <div style="font-size: 2rem;">{icon}</div>
-                <div style="flex: 1;">
-                    <h4 style="color: #93c5fd; margin: 0 0 0.5rem 0; font-size: 1.2rem;">{title}</h4>
-                    <p style="color: #94a3b8; margin: 0; font-size: 0.95rem;">{description}</p>
+
+_CARD_PLAIN = """
+        <div class="lesson-card">
+            <div class="lesson-card-body">
+                <div class="lesson-card-icon">{icon}</div>
+                <div class="lesson-card-text">
+                    <h4 class="lesson-card-title">{title}</h4>
+                    <p class="lesson-card-desc">{description}</p>
                 </div>
             </div>
         </div>
         """
-    
-    st.markdown(card_html, unsafe_allow_html=True)
+
+def _lesson_card_html(title, description, icon, progress):
+    """Lesson card markup"""
+    # Build the complete HTML in one go to avoid escaping issues
+    template = _CARD_WITH_PROGRESS if progress > 0 else _CARD_PLAIN
+    return template.format(icon=icon, title=title, description=description, progress=progress)
+
+def create_lesson_card(title, description, icon="📘", progress=0):
+    st.markdown(_lesson_card_html(title, description, icon, progress), unsafe_allow_html=True)
     
 # ====================================
 # LOGIN/REGISTER INTERFACE
 # ====================================
-def show_auth_page():
-    # Enhanced CSS for smooth, interactive login page with light blue theme
-    st.markdown("""
+# Enhanced CSS for smooth, interactive login page with light blue theme
+_AUTH_CSS = """
     <style>
-    /* Animated gradient background - Light Blue Theme */
+    /* Static gradient background - Light Blue Theme */
     div[data-testid="stAppViewContainer"] > .main,
     .stApp {
         background: linear-gradient(-45deg, #dbeafe, #bfdbfe, #93c5fd, #60a5fa) !important;
-        background-size: 400% 400% !important;
-        animation: gradientShift 15s ease infinite !important;
-    }
-    
-    @keyframes gradientShift {
-        0% { background-position: 0% 50%; }
-        50% { background-position: 100% 50%; }
-        100% { background-position: 0% 50%; }
     }
     
     /* Floating animation for logo */
@@ -1005,13 +891,12 @@ def show_auth_page():
         line-height: 1.4 !important;
     }
     
-    /* Glass morphism effect for auth card */
+    /* Translucent card for auth forms */
     .glass-card {
-        background: rgba(255, 255, 255, 0.95);
-        backdrop-filter: blur(20px);
+        background: rgba(255, 255, 255, 0.98);
         border-radius: 24px;
         border: 1px solid rgba(255, 255, 255, 0.5);
-        box-shadow: 0 8px 32px rgba(59, 130, 246, 0.2);
+        box-shadow: 0 2px 8px rgba(0, 0, 0, 0.08);
         padding: 3rem;
     }
     
@@ -1077,6 +962,8 @@ def show_auth_page():
         box-shadow: 0 4px 16px rgba(59, 130, 246, 0.3) !important;
         transition: all 0.3s cubic-bezier(0.4, 0, 0.2, 1) !important;
         color: #ffffff !important;
+        position: relative;
+        will-change: transform;
     }
     
     .stButton > button p {
@@ -1093,14 +980,27 @@ def show_auth_page():
         transform: translateY(-1px) !important;
     }
     
-    /* Pulse animation for submit buttons */
-    @keyframes pulse {
-        0%, 100% { box-shadow: 0 4px 16px rgba(59, 130, 246, 0.3); }
-        50% { box-shadow: 0 4px 24px rgba(59, 130, 246, 0.5); }
+    /* Pulse animation for submit buttons (opacity only, stays on the compositor).
+       Streamlit marks primary buttons with kind="primary", and form submit
+       buttons with kind="primaryFormSubmit" inside stFormSubmitButton */
+    @keyframes pulseGlow {
+        0%, 100% { opacity: 0.6; }
+        50% { opacity: 1; }
+    }
+    
+    [data-testid="stFormSubmitButton"] button {
+        position: relative;
     }
     
-    .stButton > button[type="primary"] {
-        animation: pulse 2s ease-in-out infinite !important;
+    .stButton > button[kind="primary"]::after,
+    [data-testid="stFormSubmitButton"] button[kind^="primary"]::after {
+        content: '';
+        position: absolute;
+        inset: -2px;
+        border-radius: inherit;
+        box-shadow: 0 4px 24px rgba(59, 130, 246, 0.5);
+        pointer-events: none;
+        animation: pulseGlow 2s ease-in-out infinite;
     }
     
     /* Feature badges */
@@ -1117,7 +1017,6 @@ def show_auth_page():
         font-weight: 600;
         color: #1e40af;
         transition: all 0.3s ease;
-        backdrop-filter: blur(10px);
         box-shadow: 0 2px 8px rgba(59, 130, 246, 0.1);
     }
     
@@ -1143,6 +1042,11 @@ def show_auth_page():
         padding: 0 !important;
     }
     
+    /* Space above form submit buttons */
+    [data-testid="stFormSubmitButton"] {
+        margin-top: 1rem;
+    }
+    
     /* Hide default streamlit elements on auth page */
     [data-testid="stHeader"] {
         background: transparent !important;
@@ -1161,17 +1065,14 @@ def show_auth_page():
     }
                 
     </style>
-    """, unsafe_allow_html=True)
-    
-    # Load logo image
-    logo_base64 = get_base64_image("assets/website_logo.png")
-    # Load header logo images
-    logo_header_white_base64 = get_base64_image("assets/website_header_logo_white.png")
+    """
 
+def _auth_hero_html(logo_src):
+    """Hero and feature badges for the login page"""
     # Hero section with animated logo
-    if logo_header_white_base64:
+    if logo_src:
         logo_html = f'''<div style="display: flex; align-items: center; justify-content: center; gap: 1rem;">
-            <img src="data:image/png;base64,{logo_header_white_base64}" style="width: 80px; height: auto;" alt="Decode Data Logo">
+            <img src="{logo_src}" style="width: 80px; height: auto;" alt="Decode Data Logo">
             <div style="
                 color: #ffffff;
                 margin: 0;
@@ -1193,7 +1094,7 @@ def show_auth_page():
             ">Decode Data</div>
         </div>'''
     
-    st.markdown(f"""
+    return f"""
     <div class="auth-container" style="text-align: center; padding: 2rem 0 3rem 0;">
         <div class="logo-container">
             {logo_html}
@@ -1202,17 +1103,19 @@ def show_auth_page():
             From SQL to Insights - Decode Data with dbt!
         </p>
     </div>
-    """, unsafe_allow_html=True)
-    
-    # Feature badges
-    st.markdown("""
     <div style="text-align: center; margin-bottom: 2rem;">
         <span class="feature-badge">📚 Interactive Lessons</span>
         <span class="feature-badge">🎯 Real Projects</span>
         <span class="feature-badge">📊 Live Analytics</span>
         <span class="feature-badge">🏆 Track Progress</span>
     </div>
-    """, unsafe_allow_html=True)
+    """
+
+def show_auth_page():
+    st.markdown(_AUTH_CSS, unsafe_allow_html=True)
+    
+    # Hero and feature badges are rendered as a single element
+    st.markdown(_auth_hero_html(get_image_src("website_header_logo_white.png")), unsafe_allow_html=True)
     
     # Auth card with glass morphism
     col1, col2, col3 = st.columns([1, 2.5, 1])
@@ -1231,7 +1134,6 @@ def show_auth_page():
                 username = st.text_input("Username", key="login_username", placeholder="Enter your username")
                 password = st.text_input("Password", type="password", key="login_password", placeholder="Enter your password")
                 
-                st.markdown("<div style='height: 1rem;'></div>", unsafe_allow_html=True)
                 submit = st.form_submit_button("Sign In", use_container_width=True, type="primary")
                 
                 if submit:
@@ -1285,7 +1187,6 @@ def show_auth_page():
                     placeholder="Confirm your password"
                 )
                 
-                st.markdown("<div style='height: 1rem;'></div>", unsafe_allow_html=True)
                 register = st.form_submit_button("Create Account", use_container_width=True, type="primary")
                 
                 if register:
@@ -1323,23 +1224,26 @@ def check_and_restore_session():
     if st.session_state.get('authenticated'):
         return True
     
+    # Only attempt a restore until it has a definite answer; a storage error
+    # leaves the check open, so the next rerun tries again
+    if st.session_state.get('_session_checked'):
+        return False
+    
     # Try to restore from query params (session token)
-    try:
-        query_params = st.experimental_get_query_params()
-        session_token = query_params.get('session', [None])[0]
-    except:
-        session_token = None
+    session_token = get_session_param()
     
     if session_token:
         # Validate and restore session from storage
         try:
-            result = st.session_state.storage_api.get(f"session:{session_token}", shared=False)
-            if result and result.get('value'):
-                session_data = json.loads(result['value'])
+            session_data = _get_storage().get_session(session_token)
+            if session_data:
                 
-                # Check if session is still valid (24 hour expiry)
-                session_created = datetime.fromisoformat(session_data.get('created_at'))
-                if (datetime.now() - session_created).total_seconds() < 86400:  # 24 hours
+                # Check if session is still valid (24 hour expiry); sessions stored by
+                # earlier versions have no created_epoch, only the created_at column
+                session_created = session_data.get('created_epoch')
+                if session_created is None:
+                    session_created = datetime.fromisoformat(session_data['created_at']).timestamp()
+                if time.time() - session_created < 86400:  # 24 hours
                     # Restore session
                     user_data = UserManager.get_user(session_data['username'])
                     if user_data:
@@ -1347,10 +1251,14 @@ def check_and_restore_session():
                         st.session_state['user_data'] = user_data
                         st.session_state['learner_id'] = user_data['username']
                         st.session_state['learner_schema'] = user_data['schema']
+                        st.session_state['_session_checked'] = True
                         return True
-        except Exception as e:
-            pass  # Session restoration failed, proceed to login
+        except Exception:
+            # Storage couldn't be read; show the login page without settling the check
+            return False
     
+    # No token, or it is unknown, expired or for a deleted user
+    st.session_state['_session_checked'] = True
     return False
 
 if not check_and_restore_session():
@@ -1372,7 +1280,7 @@ LESSONS = [
         "description": "From Raw to Refined - Introductory hands-on dbt exercise",
         "model_dir": "models/hello_dbt",
         "validation": {
-            "sql": "SELECT COUNT(*) AS models_built FROM information_schema.tables WHERE table_schema=current_schema()",
+            "sql": "SELECT COUNT(*) AS models_built FROM information_schema.tables WHERE table_schema = ?",
             "expected_min": 2
         },
     },
@@ -1382,7 +1290,7 @@ LESSONS = [
         "description": "Analyze coffee shop sales, customer loyalty, and business performance metrics.",
         "model_dir": "models/cafe_chain",
         "validation": {
-            "sql": "SELECT COUNT(*) AS models_built FROM information_schema.tables WHERE table_schema=current_schema()",
+            "sql": "SELECT COUNT(*) AS models_built FROM information_schema.tables WHERE table_schema = ?",
             "expected_min": 2
         },
     },
@@ -1392,60 +1300,189 @@ LESSONS = [
         "description": "Model IoT sensor readings and calculate energy consumption KPIs.",
         "model_dir": "models/energy_smart",
         "validation": {
-            "sql": "SELECT COUNT(*) AS models_built FROM information_schema.tables WHERE table_schema=current_schema()",
+            "sql": "SELECT COUNT(*) AS models_built FROM information_schema.tables WHERE table_schema = ?",
             "expected_min": 2
         },
     }
 ]
 
-# ====================================
-# HELPER FUNCTIONS
-# ====================================
-def run_dbt_command(command, workdir):
+# Precompute display fields derived from lesson titles: the leading emoji, the
+# title without it, and its first word as a short label
+for _lesson in LESSONS:
+    _icon, _, _title_text = _lesson["title"].partition(" ")
+    _lesson["icon"] = _icon
+    _lesson["title_text"] = _title_text or _lesson["title"]
+    _lesson["short_title"] = _title_text.split(" ", 1)[0] if _title_text else _lesson["id"]
+
+LESSON_IDS = [_lesson["id"] for _lesson in LESSONS]
+
+# ====================================
+# HELPER FUNCTIONS
+# ====================================
+# Matches dbt result lines, e.g. "1 of 3 OK created sql table model learner_x.staging_orders"
+DBT_RESULT_LINE = re.compile(r"\d+ of \d+ (OK|ERROR|SKIP|WARN)\b.*?\b(?:model|relation|seed file) ([\w\".]+)")
+
+# Result sizes are bounded before they reach the grid and the chart
+QUERY_ROW_CAP = 10000
+CHART_MAX_ROWS = 5000
+CAPPABLE_QUERY = re.compile(r"^\s*(select|with|from|values)\b", re.IGNORECASE)
+TRAILING_LIMIT = re.compile(r"\blimit\s+\d+(\s+offset\s+\d+)?\s*$", re.IGNORECASE)
+
+def apply_row_cap(query, row_cap):
+    """Wrap a single read query without its own LIMIT in an outer LIMIT"""
+    query = query.strip().rstrip(";").rstrip()
+    if ";" in query or not CAPPABLE_QUERY.match(query) or TRAILING_LIMIT.search(query):
+        return query
+    # Newlines keep a trailing "-- comment" from swallowing the wrapper
+    return f"SELECT * FROM (\n{query}\n) AS capped LIMIT {int(row_cap)}"
+
+def parse_dbt_results(logs):
+    """Map each node name reported in dbt logs to its (status, result line)"""
+    results = {}
+    for line in logs.splitlines():
+        match = DBT_RESULT_LINE.search(line)
+        if match:
+            node_name = match.group(2).replace('"', '').split('.')[-1]
+            results[node_name] = (match.group(1), line.strip())
+    return results
+
+# Upper bound for dbt's --threads; independent nodes run in parallel up to this
+DBT_MAX_THREADS = 8
+
+# Live dbt output shows only the last lines, redrawn at most every interval
+DBT_LOG_TAIL_LINES = 200
+DBT_LOG_REFRESH_SECONDS = 0.25
+
+def stream_dbt_command(command, workdir):
+    """Run a dbt command, yielding its combined stdout/stderr line by line"""
     env = os.environ.copy()
     env["MOTHERDUCK_TOKEN"] = MOTHERDUCK_TOKEN
-    result = subprocess.run(
+    with subprocess.Popen(
         ["dbt"] + command.split(),
         cwd=workdir,
-        capture_output=True,
+        stdout=subprocess.PIPE,
+        stderr=subprocess.STDOUT,
         text=True,
+        bufsize=1,
         env=env
-    )
-    return result.stdout + "\n" + result.stderr
+    ) as process:
+        yield from process.stdout
+
+def run_dbt_command(command, workdir, log_placeholder=None):
+    """Run a dbt command and return its log, tailing it into log_placeholder while it runs"""
+    lines = []
+    last_render = 0
+    for line in stream_dbt_command(command, workdir):
+        lines.append(line)
+        if log_placeholder is not None and time.monotonic() - last_render > DBT_LOG_REFRESH_SECONDS:
+            log_placeholder.code("".join(lines[-DBT_LOG_TAIL_LINES:]), language="bash")
+            last_render = time.monotonic()
+    
+    if log_placeholder is not None:
+        log_placeholder.empty()
+    return "".join(lines)
+
+@st.cache_resource(show_spinner=False)
+def _get_shared_duckdb_connection():
+    """Long-lived MotherDuck connection shared across reruns and sessions"""
+    con = duckdb.connect(f"md:{MOTHERDUCK_SHARE}?motherduck_token={MOTHERDUCK_TOKEN}")
+    con.execute(f"USE {MOTHERDUCK_SHARE}")
+    return con, threading.Lock()
 
 def get_duckdb_connection():
-    """Create a fresh connection for each use"""
-    return duckdb.connect(f"md:{MOTHERDUCK_SHARE}?motherduck_token={MOTHERDUCK_TOKEN}")
+    """Get a cursor on the shared connection; closing it leaves the connection open"""
+    con, lock = _get_shared_duckdb_connection()
+    with lock:
+        try:
+            return con.cursor()
+        except duckdb.Error:
+            pass
+    # The shared connection was closed; open a new one for every session
+    _get_shared_duckdb_connection.clear()
+    con, lock = _get_shared_duckdb_connection()
+    with lock:
+        return con.cursor()
+
+def recover_duckdb_connection():
+    """After a failed query, drop this session's cursor and reconnect if the shared connection is gone"""
+    close_learner_cursor()
+    con, lock = _get_shared_duckdb_connection()
+    with lock:
+        try:
+            con.cursor().execute("SELECT 1").close()
+            return
+        except duckdb.Error:
+            try:
+                con.close()
+            except Exception:
+                pass
+    _get_shared_duckdb_connection.clear()
+
+def get_learner_cursor(schema):
+    """Per-session cursor with the learner schema set once, reused for every query"""
+    cursor = st.session_state.get('_learner_cursor')
+    if cursor is None:
+        # Cursors start in the share database, so only the schema needs setting
+        cursor = get_duckdb_connection()
+        cursor.execute(f"SET SCHEMA '{schema}'")
+        st.session_state['_learner_cursor'] = cursor
+    return cursor
+
+def close_learner_cursor():
+    """Close this session's learner cursor; the shared connection stays open"""
+    cursor = st.session_state.pop('_learner_cursor', None)
+    if cursor is not None:
+        try:
+            cursor.close()
+        except Exception:
+            pass
 
 def list_tables(schema):
     """List tables in the specified schema"""
     try:
         con = get_duckdb_connection()
-        query = f"""
+        rows = con.execute("""
         SELECT table_name 
         FROM information_schema.tables 
-        WHERE table_schema = '{schema}'
+        WHERE table_schema = ?
         ORDER BY table_name
-        """
-        df = con.execute(query).fetchdf()
+        """, [schema]).fetchall()
         con.close()
-        return df["table_name"].tolist() if not df.empty else []
+        return [table_name for (table_name,) in rows]
     except Exception as e:
         st.error(f"Error listing tables: {e}")
         return []
 
+@st.cache_data(ttl=30, show_spinner=False)
+def list_tables_cached(schema, version):
+    """List tables in a schema, cached until the next pipeline run bumps version"""
+    return list_tables(schema)
+
 def validate_output(schema, validation):
     """Validate that the expected number of models were built"""
     try:
-        con = get_duckdb_connection()
-        con.execute(f"USE {MOTHERDUCK_SHARE}")
-        con.execute(f"SET SCHEMA '{schema}'")
-        res = con.execute(validation["sql"]).fetchdf().to_dict(orient="records")[0]
-        con.close()
+        # Validation queries take the schema as a bound parameter
+        con = get_learner_cursor(schema)
+        (models_built,) = con.execute(validation["sql"], [schema]).fetchone()
+        res = {"models_built": models_built}
         return res.get("models_built", 0) >= validation["expected_min"], res
     except Exception as e:
+        recover_duckdb_connection()
         return False, {"error": str(e)}
 
+@st.cache_data(max_entries=128, show_spinner=False)
+def _read_file_mtime(path, mtime):
+    """Read a text file, memoized per (path, mtime) so edits invalidate the cache"""
+    with open(path, "rb") as f:
+        return f.read().decode("utf-8")
+
+def _prefetch_models(username, lesson_id):
+    """Saved models of a lesson, fetched in one storage read per session and lesson"""
+    cache_key = f'_models_{lesson_id}'
+    if cache_key not in st.session_state:
+        st.session_state[cache_key] = _get_storage().get_models(username, lesson_id)
+    return st.session_state[cache_key]
+
 def load_model_sql(model_path):
     """Load model SQL from file or storage"""
     username = st.session_state.get('learner_id')
@@ -1454,27 +1491,50 @@ def load_model_sql(model_path):
     if username and lesson_id:
         model_name = os.path.basename(model_path).replace('.sql', '')
         
-        # Try to load from storage first
-        try:
-            result = st.session_state.storage_api.get(
-                f"model:{username}:{lesson_id}:{model_name}",
-                shared=False
-            )
-            if result and result.get('value'):
-                model_data = json.loads(result['value'])
-                return model_data['model_sql']
-        except:
-            pass
+        # Try the lesson's saved models first
+        model_data = _prefetch_models(username, lesson_id).get(model_name)
+        if model_data:
+            return model_data['model_sql']
     
     # Fallback to file
-    return open(model_path).read() if os.path.exists(model_path) else ""
+    try:
+        return _read_file_mtime(model_path, os.stat(model_path).st_mtime_ns)
+    except FileNotFoundError:
+        return ""
+
+def create_sandbox_project(sandbox_dir):
+    """Copy the dbt project template into a sandbox, hardlinking files where possible"""
+    # Build output is written in place, and each sandbox writes its own
+    # profiles.yml, so none of these are shared with the template
+    ignore = shutil.ignore_patterns("target", "logs", "profiles.yml")
+    try:
+        shutil.copytree("dbt_project", sandbox_dir, dirs_exist_ok=True, copy_function=os.link, ignore=ignore)
+    except (OSError, shutil.Error):
+        # Hardlinks are unavailable (e.g. across devices), fall back to a full copy
+        shutil.rmtree(sandbox_dir, ignore_errors=True)
+        shutil.copytree("dbt_project", sandbox_dir, dirs_exist_ok=True, ignore=ignore)
+
+def write_sandbox_file(path, content):
+    """Write a sandbox file without modifying the template it may be hardlinked to"""
+    try:
+        if os.stat(path).st_nlink > 1:
+            os.unlink(path)
+    except FileNotFoundError:
+        pass
+    with open(path, "wb") as f:
+        f.write(content.encode("utf-8"))
 
 def save_model_sql(model_path, sql):
     """Save model SQL to both file and storage"""
+    # Saving the SQL that was last saved (e.g. Save without edits) is a no-op
+    sql_hash = hashlib.blake2b(sql.encode("utf-8"), digest_size=8).digest()
+    hash_key = f'_sql_hash_{model_path}'
+    if st.session_state.get(hash_key) == sql_hash:
+        return
+    
     # Save to file
     os.makedirs(os.path.dirname(model_path), exist_ok=True)
-    with open(model_path, "w") as f:
-        f.write(sql)
+    write_sandbox_file(model_path, sql)
     
     # Save to storage for persistence
     username = st.session_state.get('learner_id')
@@ -1487,22 +1547,188 @@ def save_model_sql(model_path, sql):
                 'model_sql': sql,
                 'last_updated': datetime.now().isoformat()
             }
-            st.session_state.storage_api.set(
-                f"model:{username}:{lesson_id}:{model_name}",
-                json.dumps(model_data),
-                shared=False
-            )
+            if _get_storage().set_model(username, lesson_id, model_name, model_data):
+                # Keep the prefetched models in step with what was just saved
+                _prefetch_models(username, lesson_id)[model_name] = model_data
+                st.session_state[hash_key] = sql_hash
+            else:
+                st.warning("Could not persist model to storage. Your changes are saved in this session only.")
         except Exception as e:
             st.warning(f"Could not persist model to storage: {e}")
+    else:
+        st.session_state[hash_key] = sql_hash
+
+def reset_model_sql(model_path, editor_key):
+    """Restore a model from the project template (runs as a button callback)"""
+    template_path = os.path.join("dbt_project", os.path.relpath(model_path, st.session_state["dbt_dir"]))
+    try:
+        original_sql = _read_file_mtime(template_path, os.stat(template_path).st_mtime_ns)
+    except FileNotFoundError:
+        original_sql = ""
+    
+    # Widget state can only be replaced before the widget is drawn, hence the callback
+    st.session_state[editor_key] = original_sql
+    save_model_sql(model_path, original_sql)
 
 def get_model_files(model_dir):
     """Get all .sql model files in the directory"""
-    if not os.path.exists(model_dir):
+    try:
+        with os.scandir(model_dir) as entries:
+            return sorted(e.name for e in entries if e.name.endswith(".sql") and e.is_file())
+    except FileNotFoundError:
         return []
-    return sorted([f for f in os.listdir(model_dir) if f.endswith(".sql")])
+
+@st.cache_data(ttl=60, show_spinner=False)
+def _get_model_files_cached(model_dir, mtime):
+    """Model file listing, memoized per directory mtime so added/removed files invalidate it"""
+    return get_model_files(model_dir)
+
+# Progress is kept in session state ('_session_progress') and changed lessons are
+# handed to a background writer at most every PROGRESS_FLUSH_SECONDS, or after
+# PROGRESS_FLUSH_EVERY updates, so storage round-trips stay off the render path
+PROGRESS_FLUSH_SECONDS = 5
+PROGRESS_FLUSH_EVERY = 5
+# Steps whose progress is flushed at once rather than waiting for the debounce
+MILESTONE_STEPS = {"sandbox_initialized", "models_executed", "lesson_completed"}
+# Longest wait for pending writes before session state is cleared
+PROGRESS_WRITE_TIMEOUT = 10
+
+def load_progress(username, lesson_id):
+    """Retrieve lesson progress, preferring this session's copy over storage"""
+    session_progress = st.session_state.get('_session_progress', {})
+    if lesson_id in session_progress:
+        return session_progress[lesson_id]
+    
+    # Lessons without updates this session are read from storage once and kept;
+    # the first update moves the lesson into _session_progress. A failed read, or
+    # one taken while a write of the lesson is in flight, isn't kept
+    loaded_progress = st.session_state.setdefault('_loaded_progress', {})
+    if lesson_id in loaded_progress:
+        return loaded_progress[lesson_id]
+    progress = UserManager.get_progress(username, lesson_id)
+    if progress is not None and not any(lesson_id in lesson_ids for _, lesson_ids, _ in st.session_state.get('_progress_writes', [])):
+        loaded_progress[lesson_id] = progress
+    return progress
+
+@st.cache_data(ttl=10, show_spinner=False)
+def _all_progress_cached(username):
+    """Stored progress for all configured lessons, briefly cached across reruns"""
+    return UserManager.get_progress_many(username, LESSON_IDS)
+
+def load_all_progress(username):
+    """Retrieve progress for all lessons, including this session's unsaved updates"""
+    all_progress = _all_progress_cached(username)
+    all_progress.update(st.session_state.get('_session_progress', {}))
+    return all_progress
+
+@st.cache_resource(show_spinner=False)
+def _get_progress_writer():
+    """Single background worker, so progress snapshots reach storage in order"""
+    return ThreadPoolExecutor(max_workers=1, thread_name_prefix="progress-writer")
+
+def _write_progress(storage_api, username, snapshots):
+    """Save progress snapshots (runs on the progress writer thread)"""
+    saved = UserManager.save_progress_many(username, snapshots, storage_api=storage_api)
+    if saved:
+        # Other sessions of the learner see the new progress without waiting for the TTL
+        _all_progress_cached.clear()
+    return saved
+
+def check_progress_writes():
+    """Mark lessons dirty again when their background write failed, so the next flush retries them"""
+    finished, pending = [], []
+    for write in st.session_state.get('_progress_writes', []):
+        (finished if write[0].done() else pending).append(write)
+    st.session_state['_progress_writes'] = pending
+    
+    for future, lesson_ids, query_counts in finished:
+        try:
+            saved = future.result()
+        except Exception:
+            saved = False
+        if not saved:
+            st.session_state.setdefault('_dirty_progress', set()).update(lesson_ids)
+            unsent = st.session_state.setdefault('_unsent_queries', {})
+            for lesson_id, count in query_counts.items():
+                unsent[lesson_id] = unsent.get(lesson_id, 0) + count
+
+def flush_progress():
+    """Hand all unsaved progress updates to the background writer"""
+    check_progress_writes()
+    username = st.session_state.get('learner_id')
+    dirty = st.session_state.get('_dirty_progress')
+    st.session_state['_last_flush'] = time.monotonic()
+    
+    if not username or not dirty:
+        return True
+    
+    try:
+        storage_api = _get_storage()
+    except Exception:
+        # Storage isn't reachable yet; the updates stay dirty for the next flush
+        return False
+    
+    session_progress = st.session_state['_session_progress']
+    unsent = st.session_state.setdefault('_unsent_queries', {})
+    snapshots, query_counts = {}, {}
+    for lesson_id in dirty:
+        snapshots[lesson_id] = copy.deepcopy(session_progress[lesson_id])
+        # Storage adds queries_run to its own count, so only new queries are sent
+        query_counts[lesson_id] = snapshots[lesson_id]['queries_run'] = unsent.pop(lesson_id, 0)
+    dirty.clear()
+    future = _get_progress_writer().submit(_write_progress, storage_api, username, snapshots)
+    st.session_state.setdefault('_progress_writes', []).append((future, set(snapshots), query_counts))
+    return True
+
+def wait_for_progress_writes(timeout=PROGRESS_WRITE_TIMEOUT):
+    """Block until this session's progress writes have landed, so a rerun reads them back"""
+    futures = [future for future, _, _ in st.session_state.get('_progress_writes', [])]
+    if futures:
+        wait(futures, timeout=timeout)
+    check_progress_writes()
+
+def queue_progress(lesson_id, progress, flush=False):
+    """Record a progress update for this session, flushing when asked or when a flush is due"""
+    st.session_state.setdefault('_session_progress', {})[lesson_id] = progress
+    st.session_state.setdefault('_dirty_progress', set()).add(lesson_id)
+    update_count = st.session_state.get('_progress_updates', 0) + 1
+    st.session_state['_progress_updates'] = update_count
+    
+    since_flush = time.monotonic() - st.session_state.get('_last_flush', 0)
+    if flush or since_flush > PROGRESS_FLUSH_SECONDS or update_count % PROGRESS_FLUSH_EVERY == 0:
+        # The update is kept in the session either way; a flush that can't run is retried
+        flush_progress()
+    return True
+
+def queue_progress_delta(username, lesson_id, delta):
+    """Merge a delta into lesson progress: numbers are added, new list items appended"""
+    progress = load_progress(username, lesson_id) or {
+        'lesson_progress': 0,
+        'completed_steps': [],
+        'models_executed': [],
+        'queries_run': 0,
+        'last_updated': None
+    }
+    
+    for field, value in delta.items():
+        if isinstance(value, (list, tuple)):
+            items = progress.setdefault(field, [])
+            seen = set(items)
+            for item in value:
+                if item not in seen:
+                    seen.add(item)
+                    items.append(item)
+        else:
+            progress[field] = progress.get(field, 0) + value
+    
+    if 'queries_run' in delta:
+        unsent = st.session_state.setdefault('_unsent_queries', {})
+        unsent[lesson_id] = unsent.get(lesson_id, 0) + delta['queries_run']
+    
+    return queue_progress(lesson_id, progress)
 
 def update_progress(increment=10, step_name=None):
-    """Update learner progress and save to storage"""
+    """Update learner progress and queue it for storage"""
     username = st.session_state.get('learner_id')
     lesson_id = st.session_state.get('current_lesson')
     
@@ -1510,7 +1736,7 @@ def update_progress(increment=10, step_name=None):
         return
     
     # Get current progress
-    progress = UserManager.get_progress(username, lesson_id)
+    progress = load_progress(username, lesson_id)
     if not progress:
         progress = {
             'lesson_progress': 0,
@@ -1530,8 +1756,8 @@ def update_progress(increment=10, step_name=None):
         if step_name not in progress['completed_steps']:
             progress['completed_steps'].append(step_name)
     
-    # Save progress
-    success = UserManager.save_progress(username, lesson_id, progress)
+    # Queue progress for storage, saving milestones right away
+    success = queue_progress(lesson_id, progress, flush=step_name in MILESTONE_STEPS)
     
     if success:
         # Update session state to reflect changes immediately
@@ -1540,21 +1766,78 @@ def update_progress(increment=10, step_name=None):
     
     return success
 
+# Buffered updates older than the flush interval are saved on the next rerun,
+# even if no further progress update comes along to trigger the flush
+check_progress_writes()
+if (st.session_state.get('_dirty_progress')
+        and time.monotonic() - st.session_state.get('_last_flush', 0) > PROGRESS_FLUSH_SECONDS):
+    flush_progress()
+
+def fetch_arrow(cursor):
+    """Arrow table of a cursor's result; newer duckdb returns a batch reader from .arrow()"""
+    result = cursor.arrow()
+    return result.read_all() if isinstance(result, pa.RecordBatchReader) else result
+
+def get_query_frame():
+    """Pandas copy of the last query result, converted on first use"""
+    if "query_frame" not in st.session_state:
+        table = st.session_state["query_result"]
+        # DECIMAL columns (SUM of integers included) would become object columns
+        # of Decimal in pandas; as float64 they chart as numbers
+        schema = pa.schema([
+            field.with_type(pa.float64()) if pa.types.is_decimal(field.type) else field
+            for field in table.schema
+        ])
+        st.session_state["query_frame"] = table.cast(schema).to_pandas(split_blocks=True)
+    return st.session_state["query_frame"]
+
+CHART_MARKS = {"Bar": "bar", "Line": "line", "Area": "area", "Point": "point"}
+
+def _field_type(series):
+    """Vega-Lite field type for a result column"""
+    if pd.api.types.is_datetime64_any_dtype(series):
+        return 'temporal'
+    if pd.api.types.is_numeric_dtype(series):
+        return 'quantitative'
+    # DECIMAL values that reached pandas unconverted are still numbers
+    if series.dtype == object:
+        first = series.first_valid_index()
+        if first is not None and isinstance(series[first], Decimal):
+            return 'quantitative'
+    return 'nominal'
+
+def build_chart_spec(df, x_axis, y_axis, chart_type):
+    """Vega-Lite spec (without data) for a query result chart, memoized in session state"""
+    x_type, y_type = _field_type(df[x_axis]), _field_type(df[y_axis])
+    key = (x_axis, x_type, y_axis, y_type, chart_type, tuple(df.columns))
+    
+    specs = st.session_state.setdefault('_chart_specs', {})
+    if key not in specs:
+        if len(specs) >= 64:
+            specs.clear()
+        specs[key] = {
+            "mark": CHART_MARKS[chart_type],
+            "encoding": {
+                "x": {"field": x_axis, "type": x_type},
+                "y": {"field": y_axis, "type": y_type},
+                "tooltip": [{"field": column} for column in df.columns],
+            },
+            "height": 400,
+        }
+    return specs[key]
+
 # ====================================
 # HEADER WITH USER INFO
 # ====================================
 
-col1, col2, col3 = st.columns([3, 2, 1])
-with col1:
-    # Load header logo image
-    logo_header_base64 = get_base64_image("assets/website_header_logo.png")
-
-    if logo_header_base64:
-        header_logo_html = f'<img src="data:image/png;base64,{logo_header_base64}" style="width: 50px; height: auto; vertical-align: middle;" alt="Decode Data Logo">'
+def _header_html(logo_src):
+    """App header with logo and title"""
+    if logo_src:
+        header_logo_html = f'<img src="{logo_src}" style="width: 50px; height: auto; vertical-align: middle;" alt="Decode Data Logo">'
     else:
         header_logo_html = '<span style="font-size: 2rem; vertical-align: middle;">🦆</span>'
 
-    st.markdown(f"""
+    return f"""
     <div style="text-align: left;">
         <div style="display: flex; align-items: center; gap: 0.75rem; margin-bottom: 0.25rem;">
             {header_logo_html}
@@ -1570,7 +1853,11 @@ with col1:
             Interactive dbt Learning Platform
         </p>
     </div>
-    """, unsafe_allow_html=True)
+    """
+
+col1, col2, col3 = st.columns([3, 2, 1])
+with col1:
+    st.markdown(_header_html(get_image_src("website_header_logo.png")), unsafe_allow_html=True)
 
 with col2:
     user_data = st.session_state['user_data']
@@ -1578,24 +1865,19 @@ with col2:
 
 with col3:
     if st.button("🚪 Logout", use_container_width=True):
-        # Clear session token from query params
-        try:
-            query_params = st.experimental_get_query_params()
-            session_token = query_params.get('session', [None])[0]
-            if session_token:
-                try:
-                    st.session_state.storage_api.delete(f"session:{session_token}", shared=False)
-                except:
-                    pass
-            
-            # Clear query params
-            st.experimental_set_query_params()
-        except:
-            pass
+        # Persist any buffered progress before the session is dropped
+        flush_progress()
+        wait_for_progress_writes()
+        
+        # Clear session token from query params (only set when a token is present)
+        session_token = get_session_param()
+        if session_token:
+            _get_storage().delete_session(session_token)
+            set_session_param(None)
         
         # Clear session
-        for key in list(st.session_state.keys()):
-            st.session_state.pop(key)
+        close_learner_cursor()
+        st.session_state.clear()
         st.rerun()
 
 # ====================================
@@ -1604,15 +1886,15 @@ with col3:
 
 # Display overall progress
 username = st.session_state['learner_id']
-all_progress = UserManager.get_all_progress(username)
+all_progress = load_all_progress(username)
+lesson_progs = [all_progress.get(lesson_item['id'], {}).get('lesson_progress', 0) for lesson_item in LESSONS]
 
-if all_progress and any(p.get('lesson_progress', 0) > 0 for p in all_progress.values()):
+if any(lesson_progs):
     st.markdown("### 📊 Your Learning Progress")
     cols = st.columns(len(LESSONS))
     for idx, lesson_item in enumerate(LESSONS):
         with cols[idx]:
-            lesson_prog = all_progress.get(lesson_item['id'], {}).get('lesson_progress', 0)
-            st.metric(lesson_item['title'].split()[1], f"{lesson_prog}%")
+            st.metric(lesson_item['short_title'], f"{lesson_progs[idx]}%")
 
 # Lesson Selection
 st.markdown("### 📚 Choose Your Learning Path")
@@ -1625,7 +1907,7 @@ lesson = st.selectbox(
 
 if lesson:
     # Load lesson progress from storage
-    current_progress = UserManager.get_progress(username, lesson['id'])
+    current_progress = load_progress(username, lesson['id'])
     if not current_progress:
         current_progress = {
             'lesson_progress': 0,
@@ -1641,9 +1923,9 @@ if lesson:
     
     # Display lesson card with progress
     create_lesson_card(
-        lesson["title"], 
+        lesson["title_text"], 
         lesson["description"], 
-        lesson["title"].split()[0],
+        lesson["icon"],
         current_progress.get('lesson_progress', 0)
     )
     
@@ -1654,6 +1936,22 @@ if lesson:
 # ====================================
 # SANDBOX SETUP
 # ====================================
+# Login state survives Reset Session; everything else in the session is dropped
+_KEEP_ON_RESET = frozenset({"authenticated", "user_data", "learner_id", "learner_schema"})
+
+# dbt profile written into each sandbox
+_PROFILES_TEMPLATE = string.Template("""
+decode_dbt:
+  target: dev
+  outputs:
+    dev:
+      type: duckdb
+      path: "md:$share"
+      schema: $schema
+      threads: 4
+      motherduck_token: $token
+""")
+
 st.markdown("### 🚀 Setup Your Learning Environment")
 col1, col2 = st.columns([3, 1])
 
@@ -1662,20 +1960,11 @@ with col1:
         if "dbt_dir" not in st.session_state:
             with st.spinner("🚀 Setting up your personal learning environment..."):
                 tmp_dir = tempfile.mkdtemp(prefix="dbt_")
-                shutil.copytree("dbt_project", tmp_dir, dirs_exist_ok=True)
-                profiles_yml = f"""
-decode_dbt:
-  target: dev
-  outputs:
-    dev:
-      type: duckdb
-      path: "md:{MOTHERDUCK_SHARE}"
-      schema: {LEARNER_SCHEMA}
-      threads: 4
-      motherduck_token: {MOTHERDUCK_TOKEN}
-"""
-                with open(os.path.join(tmp_dir, "profiles.yml"), "w") as f:
-                    f.write(profiles_yml)
+                create_sandbox_project(tmp_dir)
+                profiles_yml = _PROFILES_TEMPLATE.substitute(
+                    share=MOTHERDUCK_SHARE, schema=LEARNER_SCHEMA, token=MOTHERDUCK_TOKEN
+                )
+                write_sandbox_file(os.path.join(tmp_dir, "profiles.yml"), profiles_yml)
                 st.session_state["dbt_dir"] = tmp_dir
                 
                 # Restore any saved model edits from storage
@@ -1684,23 +1973,14 @@ decode_dbt:
                 model_dir = os.path.join(tmp_dir, lesson["model_dir"])
                 
                 if username and os.path.exists(model_dir):
-                    model_files = get_model_files(model_dir)
+                    # All of the lesson's saved models come back in one storage read
+                    saved_models = _prefetch_models(username, lesson_id)
                     restored_count = 0
-                    for model_file in model_files:
-                        model_name = model_file.replace('.sql', '')
-                        try:
-                            result = st.session_state.storage_api.get(
-                                f"model:{username}:{lesson_id}:{model_name}",
-                                shared=False
-                            )
-                            if result and result.get('value'):
-                                model_data = json.loads(result['value'])
-                                model_path = os.path.join(model_dir, model_file)
-                                with open(model_path, "w") as f:
-                                    f.write(model_data['model_sql'])
-                                restored_count += 1
-                        except:
-                            pass
+                    for model_file in get_model_files(model_dir):
+                        model_data = saved_models.get(model_file.replace('.sql', ''))
+                        if model_data:
+                            write_sandbox_file(os.path.join(model_dir, model_file), model_data['model_sql'])
+                            restored_count += 1
                     
                     if restored_count > 0:
                         st.info(f"♻️ Restored {restored_count} previously saved model(s)")
@@ -1712,36 +1992,311 @@ decode_dbt:
 
 with col2:
     if st.button("🔄 Reset Session", help="Clear current session and start fresh", use_container_width=True):
-        # Save user credentials before clearing
-        user_data = st.session_state.get("user_data")
-        learner_id = st.session_state.get("learner_id")
-        learner_schema = st.session_state.get("learner_schema")
-        storage_api = st.session_state.get("storage_api")
-        authenticated = st.session_state.get("authenticated")
+        # Persist any buffered progress before the session is cleared
+        flush_progress()
+        wait_for_progress_writes()
         
         # Clean up temp directory if exists
         if "dbt_dir" in st.session_state:
-            dbt_dir = st.session_state["dbt_dir"]
-            if os.path.exists(dbt_dir):
-                try:
-                    shutil.rmtree(dbt_dir)
-                except:
-                    pass
+            shutil.rmtree(st.session_state["dbt_dir"], ignore_errors=True)
         
-        # Clear all session state
-        for key in list(st.session_state.keys()):
-            st.session_state.pop(key)
-        
-        # Restore user credentials
-        st.session_state["authenticated"] = authenticated
-        st.session_state["user_data"] = user_data
-        st.session_state["learner_id"] = learner_id
-        st.session_state["learner_schema"] = learner_schema
-        st.session_state["storage_api"] = storage_api
+        # Clear all session state except the user credentials
+        close_learner_cursor()
+        for key in list(st.session_state.keys() - _KEEP_ON_RESET):
+            del st.session_state[key]
         
         st.success("✅ Session reset! Environment cleared.")
         st.rerun()
 
+# ====================================
+# TAB FRAGMENTS
+# ====================================
+# Widgets inside a fragment only rerun the fragment, not the whole script.
+# st.fragment needs Streamlit 1.37+ (st.experimental_fragment 1.33+); on older
+# releases the decorated blocks simply run as part of the full script.
+_st_fragment = getattr(st, "fragment", None) or getattr(st, "experimental_fragment", None)
+
+def fragment(func=None, *, run_every=None):
+    """Run a UI block as a Streamlit fragment when supported"""
+    def decorate(f):
+        if _st_fragment is None:
+            return f
+        return _st_fragment(f, run_every=run_every)
+    return decorate(func) if func is not None else decorate
+
+@fragment
+def _model_editor_fragment(model_files, model_dir):
+    """Model picker and SQL editor for the current lesson"""
+    model_choice = st.selectbox("Choose a model to explore:", model_files, key="model_selector")
+
+    model_path = os.path.join(model_dir, model_choice)
+    
+    # The text area's own state is the only copy of the SQL being edited
+    editor_key = f"sql::{model_choice}"
+    if editor_key not in st.session_state:
+        st.session_state[editor_key] = load_model_sql(model_path)
+    
+    st.markdown("**✏️ Model SQL Editor:**")
+    edited_sql = st.text_area(
+        "Edit the model SQL below:",
+        height=250, 
+        key=editor_key,
+        label_visibility="collapsed"
+    )
+
+    col1, col2 = st.columns(2)
+    with col1:
+        if st.button("💾 Save Model", use_container_width=True, key=f"save_{model_choice}"):
+            save_model_sql(model_path, edited_sql)
+            update_progress(5, f"model_saved_{model_choice}")
+            st.success("✅ Model saved successfully!")
+    with col2:
+        if st.button("🔄 Reset to Original", use_container_width=True, key=f"reset_{model_choice}",
+                     on_click=reset_model_sql, args=(model_path, editor_key)):
+            st.success("✅ Model reset to original!")
+
+@fragment
+def _query_fragment():
+    """SQL query editor, results and chart customization"""
+    username = st.session_state['learner_id']
+    lesson = st.session_state['lesson_selector']
+    
+    if not st.session_state.get("dbt_ran", False):
+        st.info("ℹ️ Please execute your dbt models in the **Build & Execute Models** tab first before querying data.")
+    else:
+        st.markdown("### 🧪 Data Exploration & Analysis")
+        
+        if "sql_query" not in st.session_state:
+            st.session_state["sql_query"] = f"SELECT * FROM information_schema.tables WHERE table_schema = '{LEARNER_SCHEMA}' LIMIT 5;"
+
+        st.markdown("**🔍 SQL Query Editor:**")
+        query = st.text_area(
+            "Write your SQL query:",
+            value=st.session_state["sql_query"],
+            height=150,
+            key="sql_editor",
+            label_visibility="collapsed"
+        )
+        row_cap = st.slider(
+            "Row cap", 100, 100000, QUERY_ROW_CAP, step=100,
+            key="query_row_cap",
+            help="Maximum rows returned by queries that don't set their own LIMIT"
+        )
+
+        if st.button("▶️ Execute Query", key="run_query_btn", use_container_width=True):
+            st.session_state["sql_query"] = query
+            try:
+                con = get_learner_cursor(LEARNER_SCHEMA)
+                table = fetch_arrow(con.execute(apply_row_cap(query, row_cap)))
+                # Keep DuckDB's Arrow result; a pandas copy is only made if a chart is drawn
+                st.session_state["query_result"] = table
+                st.session_state["query_nbytes"] = table.nbytes
+                st.session_state.pop("query_frame", None)
+                
+                # Track queries run
+                queue_progress_delta(username, lesson['id'], {'queries_run': 1})
+                
+                update_progress(10, "query_executed")
+                
+                st.success("✅ Query executed successfully!")
+            except Exception as e:
+                recover_duckdb_connection()
+                st.error(f"❌ Query Error: {e}")
+
+        if "query_result" in st.session_state and st.session_state["query_result"].num_rows > 0:
+            table = st.session_state["query_result"]
+            
+            st.markdown("**📊 Query Results:**")
+            st.dataframe(table, use_container_width=True)
+            
+            # Stats
+            col1, col2, col3 = st.columns(3)
+            with col1:
+                st.metric("Rows", table.num_rows)
+            with col2:
+                st.metric("Columns", table.num_columns)
+            with col3:
+                st.metric("Memory", f"{st.session_state['query_nbytes'] / 1024:.1f} KB")
+
+            # Visualization
+            st.markdown("**📈 Data Visualization:**")
+            all_columns = table.column_names
+
+            if len(all_columns) >= 2:
+                with st.expander("🎨 Customize Visualization", expanded=True):
+                    col1, col2, col3 = st.columns(3)
+                    with col1:
+                        x_axis = st.selectbox("X-Axis", all_columns, key="bi_xaxis")
+                    with col2:
+                        y_axis = st.selectbox("Y-Axis", all_columns, key="bi_yaxis")
+                    with col3:
+                        chart_type = st.selectbox("Chart Type", ["Bar", "Line", "Area", "Point"], key="bi_chart")
+
+                try:
+                    chart_df = get_query_frame()
+                    if len(chart_df) > CHART_MAX_ROWS:
+                        st.caption(f"Chart shows a sample of {CHART_MAX_ROWS:,} of {len(chart_df):,} rows.")
+                        # Keep row order so line and area charts still read left to right
+                        chart_df = chart_df.sample(CHART_MAX_ROWS, random_state=0).sort_index()
+                    chart_spec = build_chart_spec(chart_df, x_axis, y_axis, chart_type)
+                    st.vega_lite_chart(chart_df, chart_spec, use_container_width=True)
+                except Exception as e:
+                    st.warning(f"Unable to create chart: {e}")
+            else:
+                st.info("ℹ️ Need at least 2 columns for visualization")
+
+@fragment
+def _dashboard_fragment():
+    """Progress dashboard for the current lesson and account"""
+    import altair as alt
+    
+    username = st.session_state['learner_id']
+    lesson = st.session_state['lesson_selector']
+    
+    st.markdown("### 📈 Your Learning Journey")
+    
+    # Reload current lesson progress
+    current_progress = load_progress(username, lesson['id'])
+    if not current_progress:
+        current_progress = {
+            'lesson_progress': 0,
+            'completed_steps': [],
+            'models_executed': [],
+            'queries_run': 0,
+            'quiz_answers': {},
+            'quiz_score': 0,
+            'last_updated': None
+        }
+    
+    # Calculate quiz stats
+    quiz_questions = lesson.get('quiz', [])
+    total_quiz_points = sum(q['points'] for q in quiz_questions) if quiz_questions else 0
+    quiz_score = current_progress.get('quiz_score', 0)
+    quiz_answers = current_progress.get('quiz_answers', {})
+    questions_correct = len([q for q in quiz_answers.values() if q.get('correct', False)])
+    
+    col1, col2, col3, col4, col5 = st.columns(5)
+    with col1:
+        st.metric("Lesson Progress", f"{current_progress.get('lesson_progress', 0)}%")
+    with col2:
+        st.metric("Steps Completed", len(current_progress.get('completed_steps', [])))
+    with col3:
+        st.metric("Models Executed", len(current_progress.get('models_executed', [])))
+    with col4:
+        st.metric("Queries Run", current_progress.get('queries_run', 0))
+    with col5:
+        st.metric("Quiz Score", f"{quiz_score}/{total_quiz_points}")
+    
+    # Progress visualization
+    st.markdown("### 🎯 Lesson Progress")
+    progress_df = pd.DataFrame({
+        'Metric': ['Overall Progress'],
+        'Percentage': [current_progress.get('lesson_progress', 0)]
+    })
+    
+    chart = alt.Chart(progress_df).mark_bar(size=30).encode(
+        x=alt.X('Percentage:Q', scale=alt.Scale(domain=[0, 100]), title='Progress (%)'),
+        y=alt.Y('Metric:N', title=''),
+        color=alt.value('#3b82f6')
+    ).properties(height=100)
+    
+    st.altair_chart(chart, use_container_width=True)
+    
+    # Completed steps
+    if current_progress.get('completed_steps'):
+        st.markdown("### ✅ Completed Steps")
+        for step in current_progress['completed_steps']:
+            st.markdown(f"- {step.replace('_', ' ').title()}")
+    
+    # All lessons progress
+    st.markdown("### 📚 All Lessons Overview")
+    all_progress = load_all_progress(username)
+    
+    # Check if there's any actual progress across all lessons
+    has_progress = False
+    if all_progress:
+        for lesson_id, prog_data in all_progress.items():
+            if prog_data and prog_data.get('lesson_progress', 0) > 0:
+                has_progress = True
+                break
+    
+    if has_progress:
+        lessons_data = []
+        for lesson_item in LESSONS:
+            prog_data = all_progress.get(lesson_item['id'], {})
+            prog_value = prog_data.get('lesson_progress', 0) if prog_data else 0
+            
+            lessons_data.append({
+                'Lesson': lesson_item['title_text'],
+                'Progress': prog_value
+            })
+        
+        lessons_df = pd.DataFrame(lessons_data)
+        
+        chart = alt.Chart(lessons_df).mark_bar().encode(
+            x=alt.X('Progress:Q', scale=alt.Scale(domain=[0, 100]), title='Progress (%)'),
+            y=alt.Y('Lesson:N', title='', sort='-x'),
+            color=alt.Color('Progress:Q', scale=alt.Scale(scheme='blues'), legend=None),
+            tooltip=['Lesson', 'Progress']
+        ).properties(height=200)
+        
+        st.altair_chart(chart, use_container_width=True)
+    else:
+        st.info("📚 Start working on lessons to see your progress here!")
+    
+    # Last updated
+    if current_progress.get('last_updated'):
+        try:
+            last_update = datetime.fromisoformat(current_progress['last_updated'])
+            st.info(f"📅 Last updated: {last_update.strftime('%Y-%m-%d %H:%M:%S')}")
+        except (TypeError, ValueError):
+            pass
+    
+    # Account info
+    st.markdown("### 👤 Account Information")
+    user_data = st.session_state['user_data']
+    col1, col2 = st.columns(2)
+    with col1:
+        st.markdown(f"""
+        **Username:** {user_data['username']}  
+        **Email:** {user_data['email']}
+        """)
+    with col2:
+        try:
+            created = datetime.fromisoformat(user_data['created_at'])
+            created_str = created.strftime('%Y-%m-%d')
+        except (KeyError, TypeError, ValueError):
+            created_str = "N/A"
+        st.markdown(f"""
+        **Schema:** `{user_data['schema']}`  
+        **Member Since:** {created_str}
+        """)
+    
+    # Debug section (expandable) - Only show in development
+    if os.environ.get("DEBUG_MODE", "false").lower() == "true":
+        with st.expander("🔍 Debug: View Raw Progress Data", expanded=False):
+            st.markdown("**Storage Backend:**")
+            st.code(f"MotherDuck Database: {MOTHERDUCK_SHARE}", language="text")
+            
+            st.markdown("**Current Lesson Progress:**")
+            st.json(current_progress)
+            
+            st.markdown("**All Lessons Progress:**")
+            all_progress_debug = load_all_progress(username)
+            st.json(all_progress_debug if all_progress_debug else {})
+            
+            st.markdown("**Query Your Data:**")
+            st.code(f"""
+-- View your progress
+SELECT * FROM {MOTHERDUCK_SHARE}.learner_progress 
+WHERE username = '{username}';
+
+-- View your account
+SELECT username, email, schema_name, created_at 
+FROM {MOTHERDUCK_SHARE}.users 
+WHERE username = '{username}';
+            """, language="sql")
+
 # ====================================
 # TABBED INTERFACE
 # ====================================
@@ -1763,51 +2318,13 @@ if "dbt_dir" in st.session_state:
             st.warning("⚠️ Model directory not found for this lesson.")
             st.stop()
 
-        model_files = get_model_files(model_dir)
+        model_files = _get_model_files_cached(model_dir, os.path.getmtime(model_dir))
         
         if not model_files:
             st.warning("⚠️ No model files found for this lesson.")
             st.stop()
         
-        # Store original SQL in session state if not exists
-        if "original_sql" not in st.session_state:
-            st.session_state["original_sql"] = {}
-        
-        model_choice = st.selectbox("Choose a model to explore:", model_files, key="model_selector")
-
-        model_path = os.path.join(model_dir, model_choice)
-        
-        # Load and store original SQL on first load
-        if model_choice not in st.session_state["original_sql"]:
-            st.session_state["original_sql"][model_choice] = load_model_sql(model_path)
-        
-        # Initialize the editor content
-        if f"editor_{model_choice}" not in st.session_state:
-            st.session_state[f"editor_{model_choice}"] = st.session_state["original_sql"][model_choice]
-        
-        st.markdown("**✏️ Model SQL Editor:**")
-        edited_sql = st.text_area(
-            "Edit the model SQL below:",
-            value=st.session_state[f"editor_{model_choice}"], 
-            height=250, 
-            key=f"textarea_{model_choice}",
-            label_visibility="collapsed"
-        )
-
-        col1, col2 = st.columns(2)
-        with col1:
-            if st.button("💾 Save Model", use_container_width=True, key=f"save_{model_choice}"):
-                save_model_sql(model_path, edited_sql)
-                st.session_state[f"editor_{model_choice}"] = edited_sql
-                update_progress(5, f"model_saved_{model_choice}")
-                st.success("✅ Model saved successfully!")
-        with col2:
-            if st.button("🔄 Reset to Original", use_container_width=True, key=f"reset_{model_choice}"):
-                # Reset to original SQL
-                st.session_state[f"editor_{model_choice}"] = st.session_state["original_sql"][model_choice]
-                save_model_sql(model_path, st.session_state["original_sql"][model_choice])
-                st.success("✅ Model reset to original!")
-                st.rerun()
+        _model_editor_fragment(model_files, model_dir)
 
         # ====================================
         # RUN SEEDS AND MODELS
@@ -1816,53 +2333,54 @@ if "dbt_dir" in st.session_state:
         
         st.markdown("**📋 Select Models to Execute:**")
         
-        # Initialize session state
-        if "selected_models" not in st.session_state:
-            st.session_state["selected_models"] = {}
-        
-        # Create checkboxes
-        cols = st.columns(3)
-        selected_models = []
-        for idx, model_file in enumerate(model_files):
-            model_name = model_file.replace(".sql", "")
-            col = cols[idx % 3]
-            with col:
-                is_selected = st.checkbox(
-                    model_name, 
-                    value=st.session_state["selected_models"].get(model_name, False),
-                    key=f"check_{model_name}"
+        # Selections are batched in a form so ticking boxes doesn't rerun the app
+        with st.form("pipeline_form"):
+            # Initialize session state
+            if "selected_models" not in st.session_state:
+                st.session_state["selected_models"] = {}
+            
+            # Create checkboxes
+            cols = st.columns(3)
+            selected_models = []
+            for idx, model_file in enumerate(model_files):
+                model_name = model_file.replace(".sql", "")
+                col = cols[idx % 3]
+                with col:
+                    is_selected = st.checkbox(
+                        model_name, 
+                        value=st.session_state["selected_models"].get(model_name, False),
+                        key=f"check_{model_name}"
+                    )
+                    st.session_state["selected_models"][model_name] = is_selected
+                    if is_selected:
+                        selected_models.append(model_name)
+            
+            # Options
+            col1, col2 = st.columns(2)
+            with col1:
+                include_children = st.checkbox(
+                    "Include child models (+)", 
+                    value=False,
+                    help="Run downstream dependencies of selected models"
                 )
-                st.session_state["selected_models"][model_name] = is_selected
-                if is_selected:
-                    selected_models.append(model_name)
-        
-        # Options
-        col1, col2 = st.columns(2)
-        with col1:
-            include_children = st.checkbox(
-                "Include child models (+)", 
-                value=False,
-                help="Run downstream dependencies of selected models"
-            )
-        with col2:
-            full_refresh = st.checkbox(
-                "Full refresh", 
-                value=False,
-                help="Perform full refresh of models"
+            with col2:
+                full_refresh = st.checkbox(
+                    "Full refresh", 
+                    value=False,
+                    help="Perform full refresh of models"
+                )
+            
+            submitted = st.form_submit_button(
+                "▶️ Execute Data Pipeline",
+                use_container_width=True,
+                type="primary"
             )
         
-        # Display selected
-        if selected_models:
-            st.info(f"📋 **Selected:** {', '.join(selected_models)}")
-        else:
+        if submitted and not selected_models:
             st.warning("⚠️ No models selected. Please select at least one model.")
         
-        # Execute button
-        if st.button("▶️ Execute Data Pipeline", 
-                     key="run_dbt_btn", 
-                     disabled=len(selected_models) == 0,
-                     use_container_width=True,
-                     type="primary"):
+        if submitted and selected_models:
+            st.info(f"📋 **Selected:** {', '.join(selected_models)}")
             
             # Run seeds
             seed_dir = os.path.join(st.session_state["dbt_dir"], "seeds", lesson["id"])
@@ -1870,56 +2388,54 @@ if "dbt_dir" in st.session_state:
                 seed_files = [f for f in os.listdir(seed_dir) if f.endswith(".csv")]
                 if seed_files:
                     with st.spinner("🌱 Loading seed data..."):
-                        for seed_file in seed_files:
-                            seed_name = seed_file.replace(".csv", "")
-                            seed_logs = run_dbt_command(f"seed --select {seed_name}", st.session_state["dbt_dir"])
-                            with st.expander(f"📦 Seed: {seed_name}", expanded=False):
-                                st.code(seed_logs, language="bash")
+                        # Load all lesson seeds in a single dbt invocation
+                        seed_names = [seed_file.replace(".csv", "") for seed_file in seed_files]
+                        seed_threads = min(len(seed_names), DBT_MAX_THREADS)
+                        seed_logs = run_dbt_command(
+                            f"seed --select {' '.join(seed_names)} --threads {seed_threads}",
+                            st.session_state["dbt_dir"], st.empty()
+                        )
+                        seed_results = parse_dbt_results(seed_logs)
+                        status_icon = "✅" if all(seed_results.get(name, (None,))[0] == "OK" for name in seed_names) else "⚠️"
+                        with st.expander(f"{status_icon} Seeds: {', '.join(seed_names)}", expanded=False):
+                            st.code(seed_logs, language="bash")
 
             # Run models
             if selected_models:
                 with st.spinner(f"🏃 Executing {len(selected_models)} model(s)..."):
                     refresh_flag = " --full-refresh" if full_refresh else ""
+                    child_flag = "+" if include_children else ""
+                    # Child models widen the graph beyond the selection, so allow the full pool
+                    run_threads = DBT_MAX_THREADS if include_children else min(len(selected_models), DBT_MAX_THREADS)
+                    
+                    # Run all selected models in a single dbt invocation
+                    selector = " ".join(f"{lesson['id']}.{model_name}{child_flag}" for model_name in selected_models)
+                    run_logs = run_dbt_command(
+                        f"run --select {selector}{refresh_flag} --threads {run_threads}",
+                        st.session_state["dbt_dir"], st.empty()
+                    )
+                    model_results = parse_dbt_results(run_logs)
                     
                     for model_name in selected_models:
-                        if include_children:
-                            selector = f"{lesson['id']}.{model_name}+"
-                        else:
-                            selector = f"{lesson['id']}.{model_name}"
-                        
-                        run_logs = run_dbt_command(f"run --select {selector}{refresh_flag}", st.session_state["dbt_dir"])
-                        
-                        status_icon = "✅" if "Completed successfully" in run_logs or "SUCCESS" in run_logs else "⚠️"
+                        status, result_line = model_results.get(
+                            model_name, (None, "No result reported for this model - see the full log below.")
+                        )
+                        status_icon = "✅" if status == "OK" else "⚠️"
                         with st.expander(f"{status_icon} Model: {model_name}", expanded=False):
-                            st.code(run_logs, language="bash")
-
-                    # Update progress and track executed models
-                current_progress = UserManager.get_progress(username, lesson['id'])
-                if not current_progress:
-                    current_progress = {
-                        'lesson_progress': 0,
-                        'completed_steps': [],
-                        'models_executed': [],
-                        'queries_run': 0,
-                        'last_updated': None
-                    }
-                
-                if 'models_executed' not in current_progress:
-                    current_progress['models_executed'] = []
-                
-                # Add newly executed models
-                for model in selected_models:
-                    if model not in current_progress['models_executed']:
-                        current_progress['models_executed'].append(model)
-                
-                # Save the updated models list first
-                UserManager.save_progress(username, lesson['id'], current_progress)
+                            st.code(result_line, language="bash")
+                    
+                    with st.expander("📜 Full dbt run log", expanded=False):
+                        st.code(run_logs, language="bash")
+
+                # Track executed models
+                queue_progress_delta(username, lesson['id'], {'models_executed': selected_models})
                 
                 # Then update progress with increment
                 update_progress(30, "models_executed")
                 
                 st.session_state["dbt_ran"] = True
-                st.session_state["tables_list"] = list_tables(LEARNER_SCHEMA)
+                st.session_state["dbt_run_counter"] = st.session_state.get("dbt_run_counter", 0) + 1
+                st.session_state["tables_list"] = list_tables_cached(LEARNER_SCHEMA, st.session_state["dbt_run_counter"])
                 st.success(f"✅ Pipeline execution complete! Executed {len(selected_models)} model(s).")
         
         # ====================================
@@ -1962,263 +2478,13 @@ if "dbt_dir" in st.session_state:
     # ====================================
 
     with tab2:
-        if not st.session_state.get("dbt_ran", False):
-            st.info("ℹ️ Please execute your dbt models in the **Build & Execute Models** tab first before querying data.")
-        else:
-            st.markdown("### 🧪 Data Exploration & Analysis")
-            
-            if "sql_query" not in st.session_state:
-                st.session_state["sql_query"] = f"SELECT * FROM information_schema.tables WHERE table_schema = '{LEARNER_SCHEMA}' LIMIT 5;"
-
-            st.markdown("**🔍 SQL Query Editor:**")
-            query = st.text_area(
-                "Write your SQL query:",
-                value=st.session_state["sql_query"],
-                height=150,
-                key="sql_editor",
-                label_visibility="collapsed"
-            )
-
-            if st.button("▶️ Execute Query", key="run_query_btn", use_container_width=True):
-                st.session_state["sql_query"] = query
-                try:
-                    con = get_duckdb_connection()
-                    con.execute(f"USE {MOTHERDUCK_SHARE}")
-                    con.execute(f"SET SCHEMA '{LEARNER_SCHEMA}'")
-                    df = con.execute(query).fetchdf()
-                    con.close()
-                    st.session_state["query_result"] = df
-                    
-                    # Track queries run
-                    current_progress = UserManager.get_progress(username, lesson['id'])
-                    if not current_progress:
-                        current_progress = {
-                            'lesson_progress': 0,
-                            'completed_steps': [],
-                            'models_executed': [],
-                            'queries_run': 0,
-                            'last_updated': None
-                        }
-                    
-                    current_progress['queries_run'] = current_progress.get('queries_run', 0) + 1
-                    UserManager.save_progress(username, lesson['id'], current_progress)
-                    
-                    update_progress(10, "query_executed")
-                    
-                    st.success("✅ Query executed successfully!")
-                except Exception as e:
-                    st.error(f"❌ Query Error: {e}")
-
-            if "query_result" in st.session_state and not st.session_state["query_result"].empty:
-                df = st.session_state["query_result"]
-                
-                st.markdown("**📊 Query Results:**")
-                st.dataframe(df, use_container_width=True)
-                
-                # Stats
-                col1, col2, col3 = st.columns(3)
-                with col1:
-                    st.metric("Rows", len(df))
-                with col2:
-                    st.metric("Columns", len(df.columns))
-                with col3:
-                    st.metric("Memory", f"{df.memory_usage(deep=True).sum() / 1024:.1f} KB")
-
-                # Visualization
-                st.markdown("**📈 Data Visualization:**")
-                all_columns = df.columns.tolist()
-
-                if len(all_columns) >= 2:
-                    with st.expander("🎨 Customize Visualization", expanded=True):
-                        col1, col2, col3 = st.columns(3)
-                        with col1:
-                            x_axis = st.selectbox("X-Axis", all_columns, key="bi_xaxis")
-                        with col2:
-                            y_axis = st.selectbox("Y-Axis", all_columns, key="bi_yaxis")
-                        with col3:
-                            chart_type = st.selectbox("Chart Type", ["Bar", "Line", "Area", "Point"], key="bi_chart")
-
-                    try:
-                        if chart_type == "Bar":
-                            chart = alt.Chart(df).mark_bar().encode(
-                                x=alt.X(x_axis, type='nominal' if df[x_axis].dtype == 'object' else 'quantitative'),
-                                y=alt.Y(y_axis, type='nominal' if df[y_axis].dtype == 'object' else 'quantitative'),
-                                tooltip=all_columns
-                            ).properties(height=400)
-                        elif chart_type == "Line":
-                            chart = alt.Chart(df).mark_line().encode(
-                                x=alt.X(x_axis, type='nominal' if df[x_axis].dtype == 'object' else 'quantitative'),
-                                y=alt.Y(y_axis, type='nominal' if df[y_axis].dtype == 'object' else 'quantitative'),
-                                tooltip=all_columns
-                            ).properties(height=400)
-                        elif chart_type == "Area":
-                            chart = alt.Chart(df).mark_area().encode(
-                                x=alt.X(x_axis, type='nominal' if df[x_axis].dtype == 'object' else 'quantitative'),
-                                y=alt.Y(y_axis, type='nominal' if df[y_axis].dtype == 'object' else 'quantitative'),
-                                tooltip=all_columns
-                            ).properties(height=400)
-                        else:  # Point
-                            chart = alt.Chart(df).mark_point().encode(
-                                x=alt.X(x_axis, type='nominal' if df[x_axis].dtype == 'object' else 'quantitative'),
-                                y=alt.Y(y_axis, type='nominal' if df[y_axis].dtype == 'object' else 'quantitative'),
-                                tooltip=all_columns
-                            ).properties(height=400)
-                        
-                        st.altair_chart(chart, use_container_width=True)
-                    except Exception as e:
-                        st.warning(f"Unable to create chart: {e}")
-                else:
-                    st.info("ℹ️ Need at least 2 columns for visualization")
-
+        _query_fragment()
     
     # ==============================================================================
     # TAB 3: PROGRESS DASHBOARD
     # ==============================================================================
     with tab3:
-        st.markdown("### 📈 Your Learning Journey")
-        
-        # Reload current lesson progress
-        current_progress = UserManager.get_progress(username, lesson['id'])
-        if not current_progress:
-            current_progress = {
-                'lesson_progress': 0,
-                'completed_steps': [],
-                'models_executed': [],
-                'queries_run': 0,
-                'quiz_answers': {},
-                'quiz_score': 0,
-                'last_updated': None
-            }
-        
-        # Calculate quiz stats
-        quiz_questions = lesson.get('quiz', [])
-        total_quiz_points = sum(q['points'] for q in quiz_questions) if quiz_questions else 0
-        quiz_score = current_progress.get('quiz_score', 0)
-        quiz_answers = current_progress.get('quiz_answers', {})
-        questions_correct = len([q for q in quiz_answers.values() if q.get('correct', False)])
-        
-        col1, col2, col3, col4, col5 = st.columns(5)
-        with col1:
-            st.metric("Lesson Progress", f"{current_progress.get('lesson_progress', 0)}%")
-        with col2:
-            st.metric("Steps Completed", len(current_progress.get('completed_steps', [])))
-        with col3:
-            st.metric("Models Executed", len(current_progress.get('models_executed', [])))
-        with col4:
-            st.metric("Queries Run", current_progress.get('queries_run', 0))
-        with col5:
-            st.metric("Quiz Score", f"{quiz_score}/{total_quiz_points}")
-        
-        # Progress visualization
-        st.markdown("### 🎯 Lesson Progress")
-        progress_df = pd.DataFrame({
-            'Metric': ['Overall Progress'],
-            'Percentage': [current_progress.get('lesson_progress', 0)]
-        })
-        
-        chart = alt.Chart(progress_df).mark_bar(size=30).encode(
-            x=alt.X('Percentage:Q', scale=alt.Scale(domain=[0, 100]), title='Progress (%)'),
-            y=alt.Y('Metric:N', title=''),
-            color=alt.value('#3b82f6')
-        ).properties(height=100)
-        
-        st.altair_chart(chart, use_container_width=True)
-        
-        # Completed steps
-        if current_progress.get('completed_steps'):
-            st.markdown("### ✅ Completed Steps")
-            for step in current_progress['completed_steps']:
-                st.markdown(f"- {step.replace('_', ' ').title()}")
-        
-        # All lessons progress
-        st.markdown("### 📚 All Lessons Overview")
-        all_progress = UserManager.get_all_progress(username)
-        
-        # Check if there's any actual progress across all lessons
-        has_progress = False
-        if all_progress:
-            for lesson_id, prog_data in all_progress.items():
-                if prog_data and prog_data.get('lesson_progress', 0) > 0:
-                    has_progress = True
-                    break
-        
-        if has_progress:
-            lessons_data = []
-            for lesson_item in LESSONS:
-                prog_data = all_progress.get(lesson_item['id'], {})
-                prog_value = prog_data.get('lesson_progress', 0) if prog_data else 0
-                
-                lesson_name = lesson_item['title'].split(' ', 1)[1] if ' ' in lesson_item['title'] else lesson_item['title']
-                lessons_data.append({
-                    'Lesson': lesson_name,
-                    'Progress': prog_value
-                })
-            
-            lessons_df = pd.DataFrame(lessons_data)
-            
-            chart = alt.Chart(lessons_df).mark_bar().encode(
-                x=alt.X('Progress:Q', scale=alt.Scale(domain=[0, 100]), title='Progress (%)'),
-                y=alt.Y('Lesson:N', title='', sort='-x'),
-                color=alt.Color('Progress:Q', scale=alt.Scale(scheme='blues'), legend=None),
-                tooltip=['Lesson', 'Progress']
-            ).properties(height=200)
-            
-            st.altair_chart(chart, use_container_width=True)
-        else:
-            st.info("📚 Start working on lessons to see your progress here!")
-        
-        # Last updated
-        if current_progress.get('last_updated'):
-            try:
-                last_update = datetime.fromisoformat(current_progress['last_updated'])
-                st.info(f"📅 Last updated: {last_update.strftime('%Y-%m-%d %H:%M:%S')}")
-            except:
-                pass
-        
-        # Account info
-        st.markdown("### 👤 Account Information")
-        user_data = st.session_state['user_data']
-        col1, col2 = st.columns(2)
-        with col1:
-            st.markdown(f"""
-            **Username:** {user_data['username']}  
-            **Email:** {user_data['email']}
-            """)
-        with col2:
-            try:
-                created = datetime.fromisoformat(user_data['created_at'])
-                created_str = created.strftime('%Y-%m-%d')
-            except:
-                created_str = "N/A"
-            st.markdown(f"""
-            **Schema:** `{user_data['schema']}`  
-            **Member Since:** {created_str}
-            """)
-        
-        # Debug section (expandable) - Only show in development
-        if os.environ.get("DEBUG_MODE", "false").lower() == "true":
-            with st.expander("🔍 Debug: View Raw Progress Data", expanded=False):
-                st.markdown("**Storage Backend:**")
-                st.code(f"MotherDuck Database: {MOTHERDUCK_SHARE}", language="text")
-                
-                st.markdown("**Current Lesson Progress:**")
-                st.json(current_progress)
-                
-                st.markdown("**All Lessons Progress:**")
-                all_progress_debug = UserManager.get_all_progress(username)
-                st.json(all_progress_debug if all_progress_debug else {})
-                
-                st.markdown("**Query Your Data:**")
-                st.code(f"""
--- View your progress
-SELECT * FROM {MOTHERDUCK_SHARE}.learner_progress 
-WHERE username = '{username}';
-
--- View your account
-SELECT username, email, schema_name, created_at 
-FROM {MOTHERDUCK_SHARE}.users 
-WHERE username = '{username}';
-                """, language="sql")
+        _dashboard_fragment()
 
 # ====================================
 # FOOTER
@@ -2279,7 +2545,7 @@ st.markdown("---")
     
 #     # Show user stats
 #     try:
-#         con = st.session_state.storage_api._get_connection()
+#         con = _get_storage()._get_connection()
         
 #         # Count total users
 #         user_count = con.execute(f"SELECT COUNT(*) FROM {MOTHERDUCK_SHARE}.users").fetchone()[0]
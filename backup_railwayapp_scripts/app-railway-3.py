@@ -16,7 +16,7 @@ from PIL import Image
 # ====================================
 # Try to load custom page icon
 try:
-    page_icon = Image.open("assets/website_header_logo.png")
+    page_icon = Image.open("static/website_header_logo.png")
 except:
     page_icon = "🦆"
 
@@ -1164,9 +1164,9 @@ def show_auth_page():
     """, unsafe_allow_html=True)
     
     # Load logo image
-    logo_base64 = get_base64_image("assets/website_logo.png")
+    logo_base64 = get_base64_image("static/website_logo.png")
     # Load header logo images
-    logo_header_white_base64 = get_base64_image("assets/website_header_logo_white.png")
+    logo_header_white_base64 = get_base64_image("static/website_header_logo_white.png")
 
     # Hero section with animated logo
     if logo_header_white_base64:
@@ -1547,7 +1547,7 @@ def update_progress(increment=10, step_name=None):
 col1, col2, col3 = st.columns([3, 2, 1])
 with col1:
     # Load header logo image
-    logo_header_base64 = get_base64_image("assets/website_header_logo.png")
+    logo_header_base64 = get_base64_image("static/website_header_logo.png")
 
     if logo_header_base64:
         header_logo_html = f'<img src="data:image/png;base64,{logo_header_base64}" style="width: 50px; height: auto; vertical-align: middle;" alt="Decode Data Logo">'